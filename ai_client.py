@@ -0,0 +1,200 @@
+"""One Anthropic client per process, shared by every Streamlit session.
+
+Adds what the SDK client alone doesn't give us across sessions: a tuned
+keep-alive pool, retries with jittered exponential backoff on 429/529, and
+a token-bucket limiter for the org's requests and input tokens per minute.
+
+Limits come from the environment:
+    ANTHROPIC_RPM     requests per minute (default 50)
+    ANTHROPIC_ITPM    input tokens per minute (default 30000)
+"""
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import anthropic
+import httpx
+
+RETRY_STATUS = (429, 529)
+MAX_ATTEMPTS = 5
+
+# A PDF page costs an image plus its extracted text
+PDF_PAGE_TOKENS = 2500
+PDF_BYTES_PER_PAGE = 50 * 1024   # lecture slides with a picture or two
+IMAGE_TOKENS = 1600
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket; the level may go negative to pay back under-estimates"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount):
+        # Never wait for more than a full bucket, or a huge request would block forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and input-tokens-per-minute buckets"""
+
+    def __init__(self, rpm, itpm):
+        self.requests = TokenBucket(rpm)
+        self.input_tokens = TokenBucket(itpm)
+
+    def acquire(self, estimated_tokens):
+        self.requests.acquire(1)
+        self.input_tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens, usage):
+        """Charge the difference between the estimate and what the API reported"""
+        if usage is None:
+            return
+        # Cache reads don't count towards the input token limit
+        actual = (usage.input_tokens or 0) + (getattr(usage, 'cache_creation_input_tokens', 0) or 0)
+        self.input_tokens.adjust(actual - estimated_tokens)
+
+
+def estimate_pdf_tokens(data):
+    """Tokens for a base64 PDF document block: a page image plus the text of every page.
+
+    Pages are guessed from the size alone, since decoding and parsing the
+    PDF on every call costs more than the estimate is worth; settle()
+    charges the difference once the API reports the real count.
+    """
+    pdf_size = len(data) * 3 // 4
+    return (pdf_size // PDF_BYTES_PER_PAGE + 1) * PDF_PAGE_TOKENS
+
+
+def estimate_input_tokens(request):
+    """Rough pre-flight estimate; settle() corrects it once usage comes back"""
+    chars = len(request.get('system', '') or '')
+    tokens = 0
+    for message in request.get('messages', []):
+        content = message['content']
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for block in content:
+            if block.get('type') == 'text':
+                chars += len(block['text'])
+            elif block.get('type') == 'document' and block['source'].get('type') == 'base64':
+                tokens += estimate_pdf_tokens(block['source']['data'])
+            elif block.get('type') == 'image':
+                tokens += IMAGE_TOKENS
+    return tokens + chars // 4 + 1
+
+
+def with_retries(call):
+    """Run call(), retrying 429/529 and dropped connections with full-jitter backoff"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return call()
+        except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+            status = getattr(e, 'status_code', None)
+            retryable = isinstance(e, anthropic.APIConnectionError) or status in RETRY_STATUS
+            if not retryable or attempt == MAX_ATTEMPTS - 1:
+                raise
+            delay = random.uniform(0, min(30, 2 ** attempt))
+            response = getattr(e, 'response', None)
+            retry_after = response.headers.get('retry-after') if response is not None else None
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            time.sleep(delay)
+
+
+class _Messages:
+    """Drop-in for client.messages that goes through the limiter and retries"""
+
+    def __init__(self, shared):
+        self._shared = shared
+
+    def __getattr__(self, name):
+        # batches, count_tokens, ... go straight to the SDK
+        return getattr(self._shared.client.messages, name)
+
+    def create(self, **request):
+        estimate = estimate_input_tokens(request)
+        self._shared.limiter.acquire(estimate)
+        response = with_retries(lambda: self._shared.client.messages.create(**request))
+        self._shared.limiter.settle(estimate, response.usage)
+        return response
+
+    @contextmanager
+    def stream(self, **request):
+        estimate = estimate_input_tokens(request)
+        self._shared.limiter.acquire(estimate)
+
+        def open_stream():
+            manager = self._shared.client.messages.stream(**request)
+            return manager, manager.__enter__()
+
+        # Only opening the stream is retried; text already shown can't be taken back
+        manager, stream = with_retries(open_stream)
+        try:
+            yield stream
+        except BaseException:
+            manager.__exit__(*sys.exc_info())
+            raise
+        try:
+            self._shared.limiter.settle(estimate, stream.current_message_snapshot.usage)
+        finally:
+            manager.__exit__(None, None, None)
+
+
+class SharedClient:
+    def __init__(self, api_key, rpm, itpm):
+        self.client = anthropic.Anthropic(
+            api_key=api_key,
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=120),
+                timeout=httpx.Timeout(600, connect=10)
+            )
+        )
+        self.limiter = RateLimiter(rpm, itpm)
+        self.messages = _Messages(self)
+
+
+def get_client(api_key=None):
+    """Process-wide client; the first caller's key wins"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SharedClient(
+                api_key or os.getenv('ANTHROPIC_API_KEY'),
+                rpm=int(os.getenv('ANTHROPIC_RPM', 50)),
+                itpm=int(os.getenv('ANTHROPIC_ITPM', 30000))
+            )
+        return _client
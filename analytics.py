@@ -0,0 +1,185 @@
+"""Cohort analytics over student_data.json-style records (see gen.generate_student_data).
+
+Records are read once into NumPy columns; every statistic after that is a
+vectorized pass over those columns rather than a loop over students.
+
+Usage:
+    python analytics.py student_data.json
+    python analytics.py student_data.json --subject Physics
+    python analytics.py student_data.ndjson
+"""
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from jsonstream import iter_records
+
+GRADE_BINS = [40, 50, 60, 70, 80, 90, 101]
+ENGAGEMENT = ['attendance_rate', 'assignment_submission_rate', 'participation_score']
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# A student is at risk if any one of these holds
+AT_RISK = {
+    'low_average': lambda c: c.average < 50,
+    'low_attendance': lambda c: c.engagement['attendance_rate'] < 70,
+    'missed_work': lambda c: c.engagement['assignment_submission_rate'] < 80,
+    'declining': lambda c: c.behavior_is("Declining"),
+    'inactive': lambda c: c.days_since_login > 5,
+}
+
+
+def _code(value, codes, names):
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(names)
+        names.append(value)
+    return code
+
+
+class Cohort:
+    """Columnar view of a cohort: one array per field, one entry per student"""
+
+    def __init__(self, records, now=None):
+        subject_codes, self.subjects = {}, []
+        behavior_codes, self.behaviors = {}, []
+        module_codes, self.modules = {}, []
+        subject, year, behavior, last_login = [], [], [], []
+        engagement = {name: [] for name in ENGAGEMENT}
+        grade_student, grade_module, grade_value = [], [], []
+
+        # The only per-student loop: copy each record's fields into flat lists
+        for i, record in enumerate(records):
+            subject.append(_code(record['subject'], subject_codes, self.subjects))
+            year.append(record['year'])
+            behavior.append(_code(record['behavior_pattern'], behavior_codes, self.behaviors))
+            for name in ENGAGEMENT:
+                engagement[name].append(record['engagement'][name])
+            last_login.append(record['engagement']['last_login'])
+            for module, grade in record['grades'].items():
+                grade_student.append(i)
+                grade_module.append(_code(module, module_codes, self.modules))
+                grade_value.append(grade)
+
+        self.subject = np.array(subject, dtype=np.int32)
+        self.year = np.array(year, dtype=np.int32)
+        self.behavior = np.array(behavior, dtype=np.int32)
+        self.engagement = {name: np.array(values, dtype=np.float64) for name, values in engagement.items()}
+        self.grade_student = np.array(grade_student, dtype=np.int64)
+        self.grade_module = np.array(grade_module, dtype=np.int32)
+        self.grade_value = np.array(grade_value, dtype=np.float64)
+
+        now = np.datetime64(now or datetime.now(), 'us')
+        logins = np.array(last_login, dtype='datetime64[us]')
+        self.days_since_login = (now - logins) / np.timedelta64(1, 'D')
+
+        # Per-student average over however many modules each one took
+        counts = np.bincount(self.grade_student, minlength=len(self))
+        totals = np.bincount(self.grade_student, weights=self.grade_value, minlength=len(self))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.average = totals / counts
+
+    @classmethod
+    def load(cls, json_file, now=None):
+        """Stream a JSON array or NDJSON file of students; only the columns stay in memory"""
+        return cls(iter_records(json_file), now)
+
+    def __len__(self):
+        return len(self.subject)
+
+    def where(self, subject=None, year=None):
+        """Boolean mask of students matching the filters"""
+        mask = np.ones(len(self), dtype=bool)
+        if subject is not None:
+            mask &= self.subject == (self.subjects.index(subject) if subject in self.subjects else -1)
+        if year is not None:
+            mask &= self.year == year
+        return mask
+
+    def behavior_is(self, pattern):
+        return self.behavior == (self.behaviors.index(pattern) if pattern in self.behaviors else -1)
+
+    def grades_by_subject(self):
+        """Count, mean, std and quartiles of student averages, per subject"""
+        stats = {}
+        order = np.argsort(self.subject, kind='stable')
+        groups = np.split(self.average[order], np.cumsum(np.bincount(self.subject, minlength=len(self.subjects)))[:-1])
+        for code, averages in enumerate(groups):
+            if len(averages) == 0:
+                continue
+            q1, median, q3 = np.percentile(averages, [25, 50, 75])
+            stats[self.subjects[code]] = {
+                'students': len(averages),
+                'mean': float(averages.mean()),
+                'std': float(averages.std()),
+                'q1': float(q1),
+                'median': float(median),
+                'q3': float(q3),
+            }
+        return stats
+
+    def grade_distribution(self, bins=GRADE_BINS):
+        """Module grades per subject, counted into grade bands: {subject: [count per band]}"""
+        band = np.digitize(self.grade_value, bins) - 1
+        subject = self.subject[self.grade_student]
+        valid = (band >= 0) & (band < len(bins) - 1)
+        counts = np.bincount(
+            subject[valid] * (len(bins) - 1) + band[valid], minlength=len(self.subjects) * (len(bins) - 1)
+        ).reshape(len(self.subjects), len(bins) - 1)
+        return {name: counts[code].tolist() for code, name in enumerate(self.subjects)}
+
+    def engagement_percentiles(self, mask=None, percentiles=PERCENTILES):
+        """{metric: {percentile: value}} over the students in mask"""
+        mask = np.ones(len(self), dtype=bool) if mask is None else mask
+        result = {}
+        for name, values in self.engagement.items():
+            points = np.percentile(values[mask], percentiles) if mask.any() else [np.nan] * len(percentiles)
+            result[name] = dict(zip(percentiles, map(float, points)))
+        return result
+
+    def at_risk(self, mask=None):
+        """How many students trip each at-risk rule, and how many trip any of them"""
+        mask = np.ones(len(self), dtype=bool) if mask is None else mask
+        flags = {name: np.asarray(rule(self), dtype=bool) & mask for name, rule in AT_RISK.items()}
+        any_flag = np.logical_or.reduce(list(flags.values()))
+        counts = {name: int(flag.sum()) for name, flag in flags.items()}
+        counts['any'] = int(any_flag.sum())
+        counts['by_subject'] = {
+            name: int(count)
+            for name, count in zip(self.subjects, np.bincount(self.subject[any_flag], minlength=len(self.subjects)))
+            if count
+        }
+        return counts
+
+
+def report(cohort, subject=None):
+    mask = cohort.where(subject=subject)
+    print(f"{int(mask.sum())} students" + (f" in {subject}" if subject else "") + "\n")
+
+    print(f"{'subject':<18} {'n':>6} {'mean':>6} {'std':>6} {'median':>7}")
+    for name, stats in sorted(cohort.grades_by_subject().items()):
+        if subject in (None, name):
+            print(f"{name:<18} {stats['students']:>6} {stats['mean']:>6.1f} {stats['std']:>6.1f} {stats['median']:>7.1f}")
+
+    bands = [f"{lo}-{hi - 1}" for lo, hi in zip(GRADE_BINS, GRADE_BINS[1:])]
+    print(f"\n{'grades':<18} " + " ".join(f"{band:>7}" for band in bands))
+    for name, counts in sorted(cohort.grade_distribution().items()):
+        if subject in (None, name):
+            print(f"{name:<18} " + " ".join(f"{count:>7}" for count in counts))
+
+    print(f"\n{'engagement':<28} " + " ".join(f"{'p' + str(p):>6}" for p in PERCENTILES))
+    for name, points in cohort.engagement_percentiles(mask).items():
+        print(f"{name:<28} " + " ".join(f"{value:>6.1f}" for value in points.values()))
+
+    risk = cohort.at_risk(mask)
+    print(f"\nAt risk: {risk['any']} ({risk['any'] / max(1, int(mask.sum())):.0%})")
+    for name in AT_RISK:
+        print(f"  {name:<16} {risk[name]:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort statistics for generated student data")
+    parser.add_argument("json_file", nargs="?", default="student_data.json")
+    parser.add_argument("--subject", help="Only report on this subject")
+    args = parser.parse_args()
+    report(Cohort.load(args.json_file), args.subject)
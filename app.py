@@ -1,14 +1,29 @@
 import streamlit as st
 import json
+import logging
 import os
-from anthropic import Anthropic
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import base64
-import tempfile
+import hashlib
+from audio import AudioCache, CHUNK_CHARS
+from tts_engines import GTTSEngine, get_engine
+from storage import UserStore, externalize_materials, migrate_json, new_material_id
+from ids import StudentIdAllocator
+from blobstore import BlobStore
+from lesson_cache import LessonCache, lesson_key, personalize_stream
+from jobs import JobQueue, ACTIVE
+from pdf_text import PdfTextCache, document_parts
+from long_lessons import long_lesson_pages, stream_long_lesson
+from prompts import anonymous, build_student_context, cached_prefix, lesson_request, notes_request
+from usage import TokenUsage
+from scheduler import DAYS
+from study_plan import local_notes, local_plan, parse_notes, plan_markdown, sessions_by_day, update_plan
+from ai_client import get_client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 st.set_page_config(
     page_title="LearnWell - Personalized Learning",
     page_icon="🎓",
@@ -432,33 +447,77 @@ st.markdown("""
 # HELPER FUNCTIONS
 # ============================================
 
+# Fixed prompts read aloud on every visit, synthesized once at startup
+UI_PROMPTS = [
+    "Enter your Student ID and Name to login.",
+    "This information helps us support you better and is completely confidential.",
+]
+
+@st.cache_resource
+def get_audio_cache():
+    """One audio cache per process, shared by every session"""
+    try:
+        engine = get_engine()
+    except Exception as e:
+        logger.warning("TTS engine unavailable (%s), using gTTS", e)
+        engine = GTTSEngine()
+    cache = AudioCache("audio_cache", engine=engine)
+    cache.prewarm(UI_PROMPTS)
+    return cache
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_lesson(lesson_sha256):
+    """Lesson bodies never change for a digest, so they can be cached by it"""
+    return BlobStore("blobs").read(lesson_sha256).decode('utf-8')
+
+def lesson_body(material):
+    if 'lesson' in material:
+        return material['lesson']
+    return load_lesson(material['lesson_sha256'])
+
 def text_to_speech(text):
     """Text to speech with UK voice"""
     try:
-        from gtts import gTTS
-        tts = gTTS(text=text, lang='en', slow=False, tld='co.uk')
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-            temp_file = fp.name
-        tts.save(temp_file)
-        with open(temp_file, 'rb') as f:
-            audio = f.read()
-        try:
-            os.unlink(temp_file)
-        except:
-            pass
-        return audio
-    except:
+        return get_audio_cache().get(text, lang='en', tld='co.uk')
+    except Exception as e:
+        logger.warning("Text to speech failed: %s", e)
         return None
 
+def play_audio(text, autoplay=True):
+    """Read text aloud; long lessons start playing as soon as the first part is ready"""
+    cache = get_audio_cache()
+    if len(text) <= CHUNK_CHARS:
+        with st.spinner("Creating audio..."):
+            audio = text_to_speech(text)
+        if audio:
+            st.audio(audio, format=cache.engine.mime, autoplay=autoplay)
+        return audio is not None
+    
+    parts = []
+    try:
+        chunks = cache.iter_long(text, lang='en', tld='co.uk')
+        with st.spinner("Creating audio..."):
+            parts.append(next(chunks))
+        st.caption("▶️ Playing the beginning while the rest is prepared...")
+        st.audio(parts[0], format=cache.engine.mime, autoplay=autoplay)
+        parts.extend(chunks)
+    except Exception as e:
+        logger.warning("Audio failed after %d parts: %s", len(parts), e)
+        if not parts:
+            return False
+        # A joined track would end where the failure was, with the rest of the lesson missing
+        st.warning("Only the beginning could be read aloud. Please try again for the rest.")
+        return True
+    if len(parts) > 1:
+        st.caption("🎧 Full audio")
+        st.audio(cache.join(parts), format=cache.engine.mime)
+    return True
+
 def speak_button(text, key, label="🔊 Listen"):
     """Accessible audio button"""
     if st.button(label, key=f"speak_{key}", help="Click to hear this text read aloud"):
-        with st.spinner("Creating audio..."):
-            audio = text_to_speech(text)
-            if audio:
-                st.audio(audio, format='audio/mp3', autoplay=True)
-            else:
-                st.warning("Audio not available. Please try again.")
+        if not play_audio(text):
+            st.warning("Audio not available. Please try again.")
 
 def render_hero(title, subtitle):
     """Render hero section"""
@@ -530,201 +589,139 @@ def get_wellness_message(user):
 # MAIN PLATFORM CLASS
 # ============================================
 
+@st.cache_resource
+def get_user_store():
+    """One user store and login index per process, shared by every session"""
+    return UserStore("users.db", group_commit_ms=int(os.getenv('LEARNWELL_GROUP_COMMIT_MS', 0)))
+
+@st.cache_resource
+def get_lesson_cache():
+    """One lesson cache per process, shared by every session"""
+    return LessonCache("lesson_cache.db")
+
+@st.cache_resource
+def get_token_usage():
+    """Token counters for every model call made by this process"""
+    return TokenUsage()
+
+@st.cache_resource
+def get_job_queue():
+    """Background workers for model calls, shared by every session"""
+    return JobQueue("jobs.db", max_workers=4)
+
 class LearnWell:
     def __init__(self):
         self.api_key = os.getenv('ANTHROPIC_API_KEY')
         self.use_mock = not self.api_key or self.api_key == 'your_api_key_here'
         if not self.use_mock:
             try:
-                self.client = Anthropic(api_key=self.api_key)
+                self.client = get_client(self.api_key)
                 self.model = "claude-sonnet-4-20250514"
             except:
                 self.use_mock = True
         self.users_file = "users_database.json"
-        if not os.path.exists(self.users_file):
-            with open(self.users_file, 'w') as f:
-                json.dump({}, f)
+        self.store = get_user_store()
+        self.ids = StudentIdAllocator("users.db")
+        self.blobs = BlobStore("blobs")
+        self.pdf_text = PdfTextCache("pdf_text")
+        self.lesson_cache = get_lesson_cache()
+        self.usage = get_token_usage()
+        # One-shot migration from the old JSON database
+        if self.store.count() == 0 and os.path.exists(self.users_file):
+            migrate_json(self.users_file, self.store, self.blobs)
     
     def load_users(self):
         try:
-            with open(self.users_file, 'r') as f:
-                return json.load(f)
+            return self.store.all()
         except:
             return {}
     
     def save_user(self, user_data):
-        users = self.load_users()
-        users[user_data['student_id']] = user_data
-        with open(self.users_file, 'w') as f:
-            json.dump(users, f, indent=2)
+        # Older records carried the PDF and lesson inline
+        externalize_materials(user_data, self.blobs)
+        self.store.put(user_data)
     
     def get_user(self, student_id, name):
-        users = self.load_users()
-        user = users.get(student_id)
-        if user and user['name'].lower().strip() == name.lower().strip():
-            return user
-        return None
+        return self.store.find(student_id, name)
     
     def build_student_context(self, student):
         """Build comprehensive student context for AI"""
-        context = f"""
-## STUDENT PROFILE
-
-**Basic Info:**
-- Name: {student['name']}
-- Age: {student['age']}
-- Subject: {student['subject']} (Year {student['year']})
-- Learning Style: {student.get('learning_style', 'Mixed')}
-- Best Study Time: {student.get('study_time', 'Flexible')}
-- Weekly Study Hours: {student.get('study_hours', 15)}
-
-**Current Wellbeing:**
-- Anxiety: {student.get('anxiety', 5)}/10
-- Stress: {student.get('stress', 5)}/10
-- Motivation: {student.get('motivation', 5)}/10
-- Sleep: {student.get('sleep_hours', 7)} hours ({student.get('sleep_quality', 'Fair')})
-"""
-        
-        if student.get('challenge', {}).get('has_challenge'):
-            ch = student['challenge']
-            context += f"""
-**Learning Challenges:**
-- Types: {', '.join(ch.get('types', ['Not specified']))}
-- Impact: {ch.get('severity', 'Moderate')}
-- What Helps: {ch.get('what_helps', 'Not specified')}
-"""
-        
-        context += f"""
-**Goals & Barriers:**
-- Main Goal: {student.get('goal', 'Academic success')}
-- Barriers: {', '.join(student.get('barriers', ['None specified']))}
-- Accessibility Needs: {', '.join(student.get('accessibility', ['None']))}
-"""
-        return context
+        return build_student_context(student)
+    
+    def _stream_text(self, **request):
+        """Yield text chunks from the model as they arrive"""
+        with self.client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                yield text
+            self.usage.record(stream.get_final_message().usage)
     
     def teach_pdf(self, student, file_name, pdf_content):
         """Generate personalized lesson from PDF"""
+        return "".join(self.stream_lesson(student, file_name, pdf_content))
+    
+    def stream_lesson(self, student, file_name, pdf_content, pdf_digest=None):
+        """Generate personalized lesson from PDF, yielding text as it is written"""
         if self.use_mock:
-            return self._mock_lesson(student, file_name)
+            yield self._mock_lesson(student, file_name)
+            return
         
+        chunks = []
         try:
-            pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
-            student_context = self.build_student_context(student)
+            # The lesson is written without the name so it can be cached for other students
+            anon = anonymous(student)
+            student_context = self.build_student_context(anon)
+            pdf_digest = pdf_digest or hashlib.sha256(pdf_content).hexdigest()
+            cache_key = lesson_key(pdf_digest, self.model, student_context)
+            cached = self.lesson_cache.get(cache_key, student['name'])
+            if cached:
+                yield cached
+                return
             
-            # Adjust complexity based on student state
-            anxiety = student.get('anxiety', 5)
-            complexity = "simple and reassuring" if anxiety >= 7 else "clear and engaging"
+            # Long lecture packs are taught section by section, in parallel
+            pages = long_lesson_pages(pdf_content, pdf_digest, self.pdf_text)
+            if pages:
+                stream = stream_long_lesson(
+                    self.client, self.model, anon, student_context, pages, pdf_content, self.usage
+                )
+            else:
+                pdf_base64, pdf_text, vision_pages = document_parts(pdf_content, pdf_digest, self.pdf_text)
+                stream = self._stream_text(
+                    **lesson_request(self.model, anon, pdf_base64, student_context, pdf_text, vision_pages)
+                )
             
-            prompt = f"""You are a skilled, empathetic tutor. Read this PDF and create a personalized lesson for this student.
-
-{student_context}
-
-## TEACHING APPROACH
-
-Based on this student's profile:
-- Use {complexity} language (Grade 8 reading level)
-- Keep paragraphs short (2-3 sentences max)
-- Include frequent encouragement
-- Match their learning style: {student.get('learning_style', 'Mixed')}
-- Consider their {student.get('study_hours', 15)} hours/week availability
-
-## LESSON STRUCTURE
-
-Create a complete lesson with:
-
-# 📚 [Topic Title]
-
-## 🎯 What You'll Learn
-A brief, encouraging overview (2-3 sentences)
-
-## 💡 Why This Matters
-Connect to their goal: "{student.get('goal', 'success')}"
-Make it relevant to {student['subject']}
-
-## 📖 Key Concepts
-
-### Concept 1: [Name]
-**The Simple Version:**
-Plain explanation in everyday language
-
-**Picture This:**
-A vivid analogy or mental image
-
-**Try It:**
-A quick practice question with answer
-
-### Concept 2: [Name]
-[Same structure...]
-
-[Continue for ALL major concepts in the PDF]
-
-## ✅ Quick Review
-- Key point 1
-- Key point 2  
-- Key point 3
-
-## 🚀 Your Action Plan
-Based on {student.get('study_hours', 15)} hours/week:
-- **Today (15 min):** [Specific task]
-- **This Week:** [Study plan]
-- **Remember:** [Encouraging note about their goal]
-
----
-💙 You're making progress, {student['name']}! Take breaks when needed.
-"""
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4000,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "document", "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_base64}},
-                        {"type": "text", "text": prompt}
-                    ]
-                }]
-            )
-            return response.content[0].text
+            def record(stream):
+                for text in stream:
+                    chunks.append(text)
+                    yield text
+            
+            yield from personalize_stream(record(stream), student['name'])
+            self.lesson_cache.put(cache_key, "".join(chunks))
             
         except Exception as e:
-            st.error(f"Error generating lesson: {e}")
-            return self._mock_lesson(student, file_name)
+            # This runs on a job worker: failing the job shows the error, where a mock would be saved as the lesson
+            logger.warning("Lesson generation failed for %s: %s", file_name, e)
+            raise
     
-    def generate_study_plan(self, student, materials):
-        """Generate a weekly study plan"""
-        if self.use_mock or not materials:
-            return self._mock_study_plan(student)
-        
-        try:
-            context = self.build_student_context(student)
-            material_list = "\n".join([f"- {m['name']}" for m in materials if not m.get('done')])
-            
-            prompt = f"""Create a personalized weekly study plan for this student. 
-
-{context}
+    def write_plan_notes(self, student, plan, days, overview=False):
+        """Have the model word a scheduled plan: notes for the given days, and optionally the overview.
 
-**Materials to Study:**
-{material_list if material_list else "No pending materials"}
-
-Create a realistic, supportive plan considering:
-- Their {student.get('study_hours', 15)} available hours/week
-- Best study time: {student.get('study_time', 'Flexible')}
-- Anxiety level: {student.get('anxiety', 5)}/10
-- Include breaks and self-care reminders
-
-Format as a simple, clear weekly schedule."""
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
-    
-    
-            
-        except Exception as e:
-            return self._mock_study_plan(student)
+        Returns {'notes': {day: note}, 'overview': str} as JSON text for the job queue.
+        """
+        by_day = sessions_by_day(plan)
+        words = {'notes': {}}
+        if not self.use_mock:
+            try:
+                message = self.client.messages.create(**notes_request(
+                    self.model, student, self.build_student_context(student),
+                    {day: by_day[day] for day in days}, plan['rhythm'], overview
+                ))
+                self.usage.record(message.usage)
+                words = parse_notes(message.content[0].text, days)
+            except Exception as e:
+                logger.warning("Plan notes fell back to local ones: %s", e)
+        missing = [day for day in days if day not in words['notes']]
+        words['notes'].update(local_notes(student, plan, missing))
+        return json.dumps(words)
         
     # ADD THIS NEW METHOD HERE:
     def _mock_project_ideas(self, student, material):
@@ -809,30 +806,31 @@ Format as a simple, clear weekly schedule."""
         
     def generate_project_ideas(self, student, material):
         """Generate real-world project ideas based on material"""
+        return "".join(self.stream_project_ideas(student, material))
+    
+    def stream_project_ideas(self, student, material):
+        """Generate real-world project ideas, yielding text as it is written"""
         if self.use_mock:
-            return self._mock_project_ideas(student, material)
+            yield self._mock_project_ideas(student, material)
+            return
         
         try:
-            context = self.build_student_context(student)
-            
-            # If we have the PDF content, use it. Otherwise use lesson summary
-            prompt_content = []
+            # Without the name, like teach_pdf, so the profile block matches its cached one
+            context = self.build_student_context(anonymous(student))
             
             # Check if we stored the PDF content
-            if 'pdf_content' in material:
+            pdf_base64, pdf_text, vision_pages = None, None, None
+            if material.get('pdf_sha256') and self.blobs.exists(material['pdf_sha256']):
+                pdf_base64, pdf_text, vision_pages = document_parts(
+                    self.blobs.read(material['pdf_sha256']), material['pdf_sha256'], self.pdf_text
+                )
+            elif 'pdf_content' in material:
                 pdf_base64 = material['pdf_content']
-                prompt_content.append({
-                    "type": "document", 
-                    "source": {
-                        "type": "base64", 
-                        "media_type": "application/pdf", 
-                        "data": pdf_base64
-                    }
-                })
             
-            prompt_text = f"""Generate 3-5 creative, real-world project ideas based on this learning material that the student can build outside of university.
-
-    {context}
+            # Same document + profile prefix as teach_pdf, so it comes from the prompt cache
+            prompt_content = cached_prefix(pdf_base64, context, pdf_text, vision_pages)
+            
+            prompt_text = f"""Generate 3-5 creative, real-world project ideas based on this learning material that the student profiled above can build outside of university.
 
     **Learning Material:** {material['name']}
 
@@ -858,15 +856,17 @@ Format as a simple, clear weekly schedule."""
 
             prompt_content.append({"type": "text", "text": prompt_text})
             
-            response = self.client.messages.create(
+            stream = self._stream_text(
                 model=self.model,
                 max_tokens=2500,
                 messages=[{"role": "user", "content": prompt_content}]
             )
-            return response.content[0].text
+            yield from personalize_stream(stream, student['name'])
             
         except Exception as e:
-            return self._mock_project_ideas(student, material)
+            # Fail the job so the dashboard says so, instead of passing off sample ideas as real ones
+            logger.warning("Project ideas failed for %s: %s", material.get('name'), e)
+            raise
         
     def _mock_lesson(self, student, file_name):
         return f"""# 📚 Learning: {file_name}
@@ -940,47 +940,6 @@ Based on your schedule:
 
 ---
 💙 Great work, {student['name']}! Every step forward counts.
-"""
-    
-    def _mock_study_plan(self, student):
-        return f"""# 📅 Your Weekly Study Plan
-
-## Overview
-Based on your {student.get('study_hours', 15)} hours/week availability
-
-### Best Times for You
-{student.get('study_time', 'Flexible scheduling')}
-
----
-
-## Monday - Wednesday
-**Focus:** Review and understand
-- 30 min: Read through materials
-- 15 min: Take notes on key points
-- 5 min: Quick break (stretch, water)
-- 10 min: Review notes
-
-## Thursday - Friday  
-**Focus:** Practice and apply
-- 20 min: Try practice questions
-- 20 min: Work through examples
-- 10 min: Note any confusion areas
-
-## Weekend
-**Focus:** Consolidate and rest
-- Saturday: 30 min light review
-- Sunday: Rest! Your brain needs it 🧠
-
----
-
-## Daily Reminders
-- 💧 Stay hydrated
-- 🧘 Take breaks every 25 minutes
-- 😴 Aim for {student.get('sleep_hours', 7)}+ hours of sleep
-- 🎯 Keep your goal in mind: {student.get('goal', 'Success!')}
-
----
-💙 You've got this, {student['name']}!
 """
 
 # ============================================
@@ -1001,6 +960,103 @@ if 'page' not in st.session_state:
     st.session_state.page = None
 
 platform = st.session_state.platform
+jobs = get_job_queue()
+
+MATERIALS_PER_PAGE = 10
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+JOB_LABELS = {
+    'lesson': "Creating your lesson",
+    'plan_notes': "Writing notes for your study plan",
+    'projects': "Generating project ideas"
+}
+
+def new_plan(user):
+    """Schedule a fresh study plan on the spot; the model words it in the background"""
+    plan = local_plan(user, user['materials'])
+    user['study_plan'] = plan
+    if not platform.use_mock:
+        jobs.submit(
+            user['student_id'], 'plan_notes', {'days': DAYS, 'created': plan['created']},
+            platform.write_plan_notes, dict(user), plan, DAYS, True
+        )
+
+def refresh_plan(user):
+    """Reschedule the saved study plan after a material change.
+
+    Sessions move locally; the model is only asked for new notes on the days
+    that changed. The caller saves the user.
+    """
+    plan = user.get('study_plan')
+    if not plan:
+        return
+    plan, days = update_plan(plan, user, user['materials'])
+    plan['notes'].update(local_notes(user, plan, days))
+    user['study_plan'] = plan
+    if days and not platform.use_mock:
+        jobs.submit(
+            user['student_id'], 'plan_notes', {'days': days, 'created': plan['created']},
+            platform.write_plan_notes, dict(user), plan, days
+        )
+
+def collect_job(user, job):
+    """Save a finished job's result where the dashboard expects it"""
+    # Another tab of the same student may be collecting it too; only one gets the claim
+    if not jobs.collect(job['id']):
+        return
+    params = job['params']
+    if job['kind'] in ('lesson', 'plan_notes'):
+        # Start from the saved record, which the other tab may have changed
+        user.update(platform.store.get(user['student_id']) or {})
+    if job['kind'] == 'lesson':
+        user['materials'].append({
+            'id': new_material_id(),
+            'name': params['name'],
+            'lesson': job['result'],
+            'pdf_sha256': params['pdf_sha256'],
+            'pdf_size': params['pdf_size'],
+            'date': datetime.now().isoformat(),
+            'done': False
+        })
+        # Move the lesson to the blob store first: that sets lesson_chars, which sizes its sessions
+        externalize_materials(user, platform.blobs)
+        refresh_plan(user)
+        platform.save_user(user)
+    elif job['kind'] == 'plan_notes':
+        plan = user.get('study_plan')
+        # A plan generated from scratch since then has its own notes
+        if plan and plan['created'] == params['created']:
+            words = json.loads(job['result'])
+            plan['notes'].update(words['notes'])
+            if words.get('overview'):
+                plan['overview'] = words['overview']
+            platform.save_user(user)
+    elif job['kind'] == 'projects':
+        st.session_state[f"projects_{params['material_id']}"] = job['result']
+        st.session_state[f"projects_timestamp_{params['material_id']}"] = datetime.now().isoformat()
+
+@st.fragment(run_every=0.5)
+def render_jobs(user):
+    """Poll background jobs without blocking the rest of the page"""
+    finished = False
+    for job in jobs.pending(user['student_id']):
+        label = JOB_LABELS.get(job['kind'], "Working")
+        if job['status'] in ACTIVE:
+            name = job['params'].get('name')
+            st.info(f"⏳ {label}{f' for **{name}**' if name else ''}... You can keep using LearnWell meanwhile.")
+            partial = jobs.partial(job['id'])
+            if partial:
+                with st.container(border=True):
+                    st.markdown(partial + " ▌")
+        elif job['status'] == 'failed':
+            if jobs.collect(job['id']):
+                st.session_state.setdefault('job_errors', []).append(f"{label} didn't work: {job['error']}")
+            finished = True
+        else:
+            collect_job(user, job)
+            finished = True
+    if finished:
+        st.rerun()
 
 # ============================================
 # MAIN APP LOGIC
@@ -1372,8 +1428,7 @@ if not st.session_state.logged_in:
                         })
                         
                         # Generate student ID
-                        users = platform.load_users()
-                        student_id = f"STU{datetime.now().year}{len(users) + 1:04d}"
+                        student_id = platform.ids.next_id()
                         
                         # Create user
                         user_data = {
@@ -1420,8 +1475,13 @@ if not st.session_state.logged_in:
 # LOGGED IN - DASHBOARD
 # ============================================
 else:
+    # Pick up changes saved by other sessions or tools; unchanged records come from the shared cache
+    st.session_state.user = platform.store.get(st.session_state.user['student_id']) or st.session_state.user
     user = st.session_state.user
     materials = user.get('materials', [])
+    # Records saved before lessons moved out of them get ids and blob-stored lessons once
+    if any('id' not in m or 'lesson' in m for m in materials):
+        platform.save_user(user)
     
     # Header
     col1, col2 = st.columns([4, 1])
@@ -1452,6 +1512,12 @@ else:
         ("Study Hours", user.get('study_hours', 15), "⏰")
     ])
     
+    # Background work in progress
+    for error in st.session_state.pop('job_errors', []):
+        render_alert(error, "warning", "⚠️")
+    if jobs.pending(user['student_id']):
+        render_jobs(user)
+    
     # Main tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📤 Upload", "📚 My Materials", "📅 Study Plan", "👤 Profile"])
     
@@ -1464,26 +1530,61 @@ else:
             "info", "📚"
         )
         
-        uploaded = st.file_uploader("Choose a PDF file", type=['pdf'], help="Maximum file size: 10MB")
+        uploaded = st.file_uploader(
+            "Choose a PDF file", type=['pdf'], help="Maximum file size: 10MB",
+            max_upload_size=MAX_UPLOAD_BYTES // (1024 * 1024)
+        )
         
         if uploaded:
-            st.success(f"✅ Ready: **{uploaded.name}**")
+            # Hash and store each upload once, in chunks, rather than on every rerun
+            ingested = st.session_state.get('ingested')
+            if ingested is None or ingested['file_id'] != uploaded.file_id:
+                ingested = None
+                if uploaded.size > MAX_UPLOAD_BYTES:
+                    render_alert("This PDF is larger than 10MB. Try splitting it into smaller parts.", "warning", "📦")
+                else:
+                    try:
+                        uploaded.seek(0)
+                        pdf_sha256, pdf_size = platform.blobs.put_stream(uploaded, MAX_UPLOAD_BYTES)
+                        ingested = st.session_state.ingested = {
+                            'file_id': uploaded.file_id, 'pdf_sha256': pdf_sha256, 'pdf_size': pdf_size
+                        }
+                    except ValueError as e:
+                        render_alert(f"{e}. Try splitting it into smaller parts.", "warning", "📦")
             
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                if st.button("🎓 Create My Lesson", type="primary", use_container_width=True):
-                    with st.spinner("Reading your PDF and creating a personalized lesson..."):
-                        pdf_bytes = uploaded.read()
-                        lesson = platform.teach_pdf(user, uploaded.name, pdf_bytes)
-                        
-                        # Save material
-                        user['materials'].append({
-                            'name': uploaded.name,
-                            'lesson': lesson,
-                            'pdf_content': base64.b64encode(pdf_bytes).decode('utf-8'),  # ← ADD THIS LINE
-                            'date': datetime.now().isoformat(),
-                            'done': False
-                        })
+            if ingested:
+                existing = next((m for m in materials if m.get('pdf_sha256') == ingested['pdf_sha256']), None)
+                if existing:
+                    render_alert(
+                        f"You already have a lesson for this PDF: **{existing['name']}**. No need to wait for a new one!",
+                        "info", "♻️"
+                    )
+                else:
+                    st.success(f"✅ Ready: **{uploaded.name}**")
+                
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    label = "🔄 Create a New Lesson Anyway" if existing else "🎓 Create My Lesson"
+                    if st.button(label, type="secondary" if existing else "primary", use_container_width=True):
+                        jobs.submit(
+                            user['student_id'], 'lesson',
+                            {'name': uploaded.name, 'pdf_sha256': ingested['pdf_sha256'], 'pdf_size': ingested['pdf_size']},
+                            platform.stream_lesson, dict(user), uploaded.name,
+                            platform.blobs.read(ingested['pdf_sha256']), ingested['pdf_sha256']
+                        )
+                        st.rerun()
+                if existing:
+                    with col2:
+                        show = st.toggle("📖 Show my lesson", key="show_existing_lesson")
+                    if show:
+                        st.markdown(lesson_body(existing))
+        
+        usage = platform.usage.summary()
+        if usage['requests']:
+            st.caption(
+                f"⚡ Prompt cache: {usage['cache_read_input_tokens']:,} input tokens reused across "
+                f"{usage['requests']} requests ({usage['cached_share']:.0%} of all input)"
+            )
     
     # ===== MATERIALS TAB =====
     with tab2:
@@ -1505,98 +1606,132 @@ else:
             elif filter_option == "Completed":
                 filtered = [m for m in materials if m.get('done')]
             
-            for idx, mat in enumerate(filtered):
+            # Only summaries are listed; a lesson body is loaded once its material is opened
+            pages = max(1, -(-len(filtered) // MATERIALS_PER_PAGE))
+            page = min(st.session_state.get('materials_page', 0), pages - 1)
+            start = page * MATERIALS_PER_PAGE
+            
+            for mat in filtered[start:start + MATERIALS_PER_PAGE]:
+                mat_id = mat['id']
                 is_done = mat.get('done', False)
                 status_icon = "✅" if is_done else "📖"
+                is_open = st.session_state.get('open_material') == mat_id
                 
-                with st.expander(f"{status_icon} {mat['name']}", expanded=False):
-                    st.caption(f"Uploaded: {mat['date'][:10]}")
+                with st.container(border=True):
+                    col_title, col_open = st.columns([5, 1])
+                    with col_title:
+                        st.markdown(f"**{status_icon} {mat['name']}**")
+                        reading = f" · ~{max(1, mat['lesson_chars'] // 1000)} min read" if mat.get('lesson_chars') else ""
+                        st.caption(f"Uploaded: {mat['date'][:10]}{reading}")
+                    with col_open:
+                        if st.button("Close" if is_open else "Open", key=f"open_{mat_id}", use_container_width=True):
+                            st.session_state.open_material = None if is_open else mat_id
+                            st.rerun()
+                    
+                    if not is_open:
+                        continue
                     
-                    # ADD 4 COLUMNS INSTEAD OF 3
+                    lesson = lesson_body(mat)
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
-                        if st.button("🔊 Listen", key=f"audio_{idx}"):
-                            audio = text_to_speech(mat['lesson'][:1000])
-                            if audio:
-                                st.audio(audio, format='audio/mp3')
+                        if st.button("🔊 Listen", key=f"audio_{mat_id}"):
+                            play_audio(lesson)
                     with col2:
                         st.download_button(
                             "💾 Download",
-                            mat['lesson'],
-                            f"lesson_{idx}.md",
-                            key=f"dl_{idx}"
+                            lesson,
+                            f"lesson_{mat['name']}.md",
+                            key=f"dl_{mat_id}"
                         )
                     with col3:
-                    # ADD THIS NEW BUTTON
-                        if st.button("🚀 Project Ideas", key=f"btn_projects_{idx}"):
-                            with st.spinner("Generating fresh project ideas based on your material..."):
-                                projects = platform.generate_project_ideas(user, mat)
-                                st.session_state[f'projects_{idx}'] = projects
-                                # Force a unique timestamp to ensure fresh generation
-                                st.session_state[f'projects_timestamp_{idx}'] = datetime.now().isoformat()
-                                st.rerun()
-
-                # SHOW PROJECTS IF GENERATED (moved outside col4)
-                if f'projects_{idx}' in st.session_state:
-                    st.markdown("---")
-                    st.markdown("### 🚀 Real-World Project Ideas")
-                    
-                    # Get the projects content
-                    projects_content = st.session_state[f'projects_{idx}']
-                    
-                    # Show when it was generated
-                    if f'projects_timestamp_{idx}' in st.session_state:
-                        timestamp = st.session_state[f'projects_timestamp_{idx}']
-                        st.caption(f"Generated: {timestamp[:19].replace('T', ' ')}")
-                    
-                    # Display the projects
-                    st.markdown(projects_content)
-                    
-                    col_audio, col_download, col_refresh = st.columns(3)
-                    with col_audio:
-                        if st.button("🔊 Listen to Projects", key=f"listen_proj_{idx}"):
-                            audio = text_to_speech(projects_content[:500])
-                            if audio:
-                                st.audio(audio, format='audio/mp3', autoplay=True)
-                    with col_download:
-                        # Make sure projects_content is a string before downloading
-                        if isinstance(projects_content, str):
-                            st.download_button(
-                                "💾 Download Project Ideas",
-                                projects_content,
-                                f"projects_{mat['name']}.md",
-                                key=f"dl_proj_{idx}"
+                        if st.button("🚀 Project Ideas", key=f"btn_projects_{mat_id}"):
+                            jobs.submit(
+                                user['student_id'], 'projects', {'material_id': mat_id, 'name': mat['name']},
+                                platform.stream_project_ideas, dict(user), dict(mat)
                             )
-                    with col_refresh:
-                        if st.button("🔄 Generate New Ideas", key=f"refresh_proj_{idx}"):
-                            with st.spinner("Generating fresh project ideas..."):
-                                projects = platform.generate_project_ideas(user, mat)
-                                st.session_state[f'projects_{idx}'] = projects
-                                st.session_state[f'projects_timestamp_{idx}'] = datetime.now().isoformat()
-                                st.rerun()
+                            st.rerun()
                     with col4:
                         if not is_done:
-                            if st.button("✅ Mark Complete", key=f"done_{idx}"):
+                            if st.button("✅ Mark Complete", key=f"done_{mat_id}"):
                                 mat['done'] = True
                                 user['completed'] = user.get('completed', 0) + 1
+                                refresh_plan(user)
                                 platform.save_user(user)
                                 st.success("Marked complete!")
                                 st.rerun()
+                    
+                    # SHOW PROJECTS IF GENERATED
+                    if f'projects_{mat_id}' in st.session_state:
+                        st.markdown("---")
+                        st.markdown("### 🚀 Real-World Project Ideas")
+                        
+                        # Get the projects content
+                        projects_content = st.session_state[f'projects_{mat_id}']
+                        
+                        # Show when it was generated
+                        if f'projects_timestamp_{mat_id}' in st.session_state:
+                            timestamp = st.session_state[f'projects_timestamp_{mat_id}']
+                            st.caption(f"Generated: {timestamp[:19].replace('T', ' ')}")
+                        
+                        # Display the projects
+                        st.markdown(projects_content)
+                        
+                        col_audio, col_download, col_refresh = st.columns(3)
+                        with col_audio:
+                            if st.button("🔊 Listen to Projects", key=f"listen_proj_{mat_id}"):
+                                play_audio(projects_content)
+                        with col_download:
+                            # Make sure projects_content is a string before downloading
+                            if isinstance(projects_content, str):
+                                st.download_button(
+                                    "💾 Download Project Ideas",
+                                    projects_content,
+                                    f"projects_{mat['name']}.md",
+                                    key=f"dl_proj_{mat_id}"
+                                )
+                        with col_refresh:
+                            if st.button("🔄 Generate New Ideas", key=f"refresh_proj_{mat_id}"):
+                                jobs.submit(
+                                    user['student_id'], 'projects', {'material_id': mat_id, 'name': mat['name']},
+                                    platform.stream_project_ideas, dict(user), dict(mat)
+                                )
+                                st.rerun()
+                    
                     st.markdown("### 📖 Your Lesson")
-                    st.markdown(mat['lesson'])
+                    st.markdown(lesson)
+            
+            if pages > 1:
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                with col_prev:
+                    if st.button("◀ Previous", disabled=page == 0, use_container_width=True):
+                        st.session_state.materials_page = page - 1
+                        st.rerun()
+                with col_page:
+                    st.caption(f"Page {page + 1} of {pages} · {len(filtered)} materials")
+                with col_next:
+                    if st.button("Next ▶", disabled=page == pages - 1, use_container_width=True):
+                        st.session_state.materials_page = page + 1
+                        st.rerun()
     
     # ===== STUDY PLAN TAB =====
     with tab3:
         st.markdown("### 📅 Your Study Plan")
         
         if st.button("🔄 Generate New Plan", type="primary"):
-            with st.spinner("Creating your personalized study plan..."):
-                plan = platform.generate_study_plan(user, materials)
-                st.session_state.study_plan = plan
+            new_plan(user)
+            platform.save_user(user)
+            st.rerun()
         
-        if 'study_plan' in st.session_state:
-            st.markdown(st.session_state.study_plan)
-            speak_button(st.session_state.study_plan[:500], "study_plan", "🔊 Listen to Plan")
+        if user.get('study_plan'):
+            plan = user['study_plan']
+            plan_text = plan_markdown(plan)
+            st.caption(f"Updated: {plan['updated'][:16].replace('T', ' ')}")
+            st.markdown(plan_text)
+            col_audio, col_download = st.columns(2)
+            with col_audio:
+                speak_button(plan_text, "study_plan", "🔊 Listen to Plan")
+            with col_download:
+                st.download_button("💾 Download Plan", plan_text, "study_plan.md", key="dl_study_plan")
         else:
             render_alert("Click 'Generate New Plan' to create a personalized weekly study schedule.", "info", "📅")
     
@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_engines import get_engine, join_wav
+
+CHUNK_CHARS = 300
+
+logger = logging.getLogger(__name__)
+
+# A full stop after these doesn't end the sentence
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:e\.g|i\.e|etc|vs|approx|Dr|Mr|Mrs|Ms|Prof|St|No|Fig|Eq)|(?:^|\s)[A-Z])\.$"
+)
+
+
+def strip_markdown(text):
+    """Turn lesson markdown into plain sentences worth reading aloud"""
+    text = re.sub(r"```.*?```", " ", text, flags=re.DOTALL)
+    text = re.sub(r"!?\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = re.sub(r"^\s{0,3}(#{1,6}|[-*+]|\d+\.|>)\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^\s*([-*_]\s*){3,}$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"[*_`~|]+", "", text)
+    text = re.sub(r"[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]", "", text)
+    # Headings and bullets usually have no full stop; end them so they're read as sentences
+    text = re.sub(r"([^.!?:\s])\s*\n", r"\1.\n", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def sentences(text):
+    """Split at sentence ends, but not after abbreviations like "e.g." or "Dr." or initials"""
+    result = []
+    for piece in re.split(r"(?<=[.!?])\s+", text):
+        if result and _ABBREVIATION.search(result[-1]):
+            result[-1] = f"{result[-1]} {piece}"
+        else:
+            result.append(piece)
+    return result
+
+
+def split_sentences(text, max_chars=CHUNK_CHARS):
+    """Pack whole sentences into chunks of at most max_chars"""
+    chunks, current = [], ""
+    for sentence in sentences(text):
+        # A single overlong sentence gets cut at word boundaries
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _mp3_frames(audio):
+    """Drop ID3 tags so MP3 chunks can be joined into one stream"""
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        audio = audio[10 + size:]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def join_mp3(parts):
+    return b"".join(_mp3_frames(part) for part in parts)
+
+
+def audio_key(engine, text, lang, tld):
+    return hashlib.sha256(f"{engine}\0{lang}\0{tld}\0{text}".encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """Audio cache keyed on (engine, text, lang, tld): an LRU in memory, backed by files on disk"""
+
+    def __init__(self, disk_dir="audio_cache", max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024, engine=None):
+        self.disk_dir = disk_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.engine = engine or get_engine()
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        os.makedirs(self.disk_dir, exist_ok=True)
+        self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.{self.engine.format}")
+
+    def _remember(self, key, audio):
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return
+            self.memory[key] = audio
+            self.memory_bytes += len(audio)
+            while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _spill(self, key, audio):
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp, self._path(key))
+        with self._disk_lock:
+            self.disk_bytes += len(audio)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently used files until the cache fits; called with _disk_lock held.
+
+        The directory is only listed here, when the running total says it is
+        over budget, and the total is reset from the listing so writes from
+        other processes are accounted for.
+        """
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+    def get(self, text, lang='en', tld='co.uk'):
+        """Return audio bytes, synthesizing only on a miss in memory and on disk"""
+        key = audio_key(self.engine.name, text, lang, tld)
+        with self._lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return audio
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                audio = f.read()
+            # Reads don't change mtime; touch the file so pruning drops the least recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.hits += 1
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            audio = self.engine.synthesize(text, lang=lang, tld=tld)
+            self._spill(key, audio)
+        self._remember(key, audio)
+        return audio
+
+    def iter_long(self, text, lang='en', tld='co.uk', workers=4):
+        """Yield audio chunks of a whole lesson in order, synthesized in parallel.
+
+        The first chunk is yielded as soon as it is ready, so playback can
+        start while the rest is still being synthesized. Each chunk is cached
+        on its own.
+        """
+        chunks = split_sentences(strip_markdown(text))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts") as pool:
+            futures = [pool.submit(self.get, chunk, lang, tld) for chunk in chunks]
+            for future in futures:
+                yield future.result()
+
+    def join(self, parts):
+        """Join chunks from iter_long into one track"""
+        return join_wav(parts) if self.engine.format == "wav" else join_mp3(parts)
+
+    def prewarm(self, texts, lang='en', tld='co.uk'):
+        """Synthesize fixed prompts in the background so the first click is instant"""
+        def run():
+            for text in texts:
+                try:
+                    self.get(text, lang, tld)
+                except Exception as e:
+                    logger.warning("Audio prewarm failed for %r: %s", text[:40], e)
+        thread = threading.Thread(target=run, name="audio-prewarm", daemon=True)
+        thread.start()
+        return thread
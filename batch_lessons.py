@@ -0,0 +1,212 @@
+"""Pre-generate lessons for a module pack with the Message Batches API.
+
+Usage:
+    python batch_lessons.py PDF_DIR STU20250001 STU20250002 ...
+    python batch_lessons.py PDF_DIR --all
+    python batch_lessons.py PDF_DIR --all --local    # offline stand-in for the batch endpoint
+
+Progress is kept in a state file, so running the same command again after
+a crash picks up the submitted batch instead of paying for it twice. Lessons
+that failed stay in the state file, and the next run submits just those.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from blobstore import BlobStore
+from fileio import atomic_write
+from lesson_cache import LessonCache, lesson_key, personalize
+from pdf_text import PdfTextCache, document_parts
+from prompts import anonymous, build_student_context, lesson_request
+from storage import UserStore, externalize_materials, migrate_json
+
+MODEL = "claude-sonnet-4-20250514"
+
+
+class LocalBatches:
+    """Stand-in for client.messages.batches that answers every request locally.
+
+    Batches are written to disk so resuming works the same way as with the API.
+    """
+
+    def __init__(self, root="local_batches"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, batch_id):
+        return os.path.join(self.root, f"{batch_id}.json")
+
+    def _respond(self, params):
+        # The profile is one of the cached prefix blocks, before the lesson prompt
+        prompt = "\n".join(block['text'] for block in params['messages'][0]['content'] if block['type'] == "text")
+        student = prompt.split("- Name: ", 1)[-1].split("\n", 1)[0].split(" (", 1)[0]
+        return f"# 📚 Lesson for {student}\n\n(Generated locally without calling the API.)\n"
+
+    def create(self, requests):
+        batch_id = f"msgbatch_local_{uuid.uuid4().hex}"
+        results = {r['custom_id']: self._respond(r['params']) for r in requests}
+        with open(self._path(batch_id), 'w') as f:
+            json.dump(results, f)
+        return SimpleNamespace(id=batch_id, processing_status="ended")
+
+    def retrieve(self, batch_id):
+        status = "ended" if os.path.exists(self._path(batch_id)) else "in_progress"
+        return SimpleNamespace(id=batch_id, processing_status=status)
+
+    def results(self, batch_id):
+        with open(self._path(batch_id), 'r') as f:
+            results = json.load(f)
+        for custom_id, text in results.items():
+            message = SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+            yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message))
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(state, path):
+    atomic_write(path, json.dumps(state, indent=2).encode('utf-8'))
+
+
+def build_requests(pdf_dir, student_ids, store, blobs, model):
+    """Build one teach_pdf request per (student, PDF) that isn't already in their materials"""
+    pdfs = sorted(name for name in os.listdir(pdf_dir) if name.lower().endswith('.pdf'))
+    requests, meta = [], {}
+    for name in pdfs:
+        with open(os.path.join(pdf_dir, name), 'rb') as f:
+            pdf_bytes = f.read()
+        pdf_sha256, pdf_size = blobs.put(pdf_bytes)
+        pdf_base64, pdf_text, vision_pages = document_parts(pdf_bytes, pdf_sha256, PdfTextCache("pdf_text"))
+        for student_id in student_ids:
+            student = store.get(student_id)
+            if student is None:
+                print(f"Skipping unknown student {student_id}")
+                continue
+            if any(m.get('pdf_sha256') == pdf_sha256 for m in student.get('materials', [])):
+                continue
+            custom_id = f"{student_id}-{pdf_sha256[:16]}"
+            requests.append({'custom_id': custom_id, 'params': lesson_request(
+                model, anonymous(student), pdf_base64, pdf_text=pdf_text, vision_pages=vision_pages
+            )})
+            meta[custom_id] = {'student_id': student_id, 'name': name, 'pdf_sha256': pdf_sha256, 'pdf_size': pdf_size}
+    return requests, meta
+
+
+def apply_result(entry, info, store, blobs, cache, model):
+    """Save one lesson into the student's materials, skipping it if already there"""
+    student = store.get(info['student_id'])
+    if student is None:
+        return False
+    materials = student.setdefault('materials', [])
+    if any(m.get('pdf_sha256') == info['pdf_sha256'] for m in materials):
+        return True
+    # Written for prompts.anonymous(student): the cache keeps the token, the material gets the name
+    lesson = entry.result.message.content[0].text
+    materials.append({
+        'name': info['name'],
+        'lesson': personalize(lesson, student['name']),
+        'pdf_sha256': info['pdf_sha256'],
+        'pdf_size': info['pdf_size'],
+        'date': datetime.now().isoformat(),
+        'done': False
+    })
+    externalize_materials(student, blobs)
+    store.put(student)
+    cache.put(lesson_key(info['pdf_sha256'], model, build_student_context(anonymous(student))), lesson)
+    return True
+
+
+def run(pdf_dir, student_ids, batches, store, blobs, cache, state_file, model=MODEL, poll_seconds=30):
+    state = load_state(state_file)
+    wanted = None
+    if state is not None and (state['batch_id'] is None or state.get('failed')):
+        # Stopped before create() returned, or a rerun for the lessons that failed: submit them again
+        wanted = set(state.get('failed') or state['requests'])
+        student_ids = sorted({state['requests'][custom_id]['student_id'] for custom_id in wanted})
+        state = None
+    if state is None:
+        requests, meta = build_requests(pdf_dir, student_ids, store, blobs, model)
+        if wanted is not None:
+            requests = [r for r in requests if r['custom_id'] in wanted]
+            meta = {custom_id: info for custom_id, info in meta.items() if custom_id in wanted}
+        if not requests:
+            print("Every student already has a lesson for every PDF.")
+            if os.path.exists(state_file):
+                os.remove(state_file)
+            return
+        batch = batches.create(requests=requests)
+        # Only a batch that exists is worth resuming
+        state = {'batch_id': batch.id, 'requests': meta, 'applied': []}
+        save_state(state, state_file)
+        print(f"Submitted {len(requests)} lessons as batch {batch.id}")
+    else:
+        print(f"Resuming batch {state['batch_id']} ({len(state['applied'])}/{len(state['requests'])} saved)")
+
+    while batches.retrieve(state['batch_id']).processing_status != "ended":
+        time.sleep(poll_seconds)
+
+    applied = set(state['applied'])
+    failed = []
+    for entry in batches.results(state['batch_id']):
+        info = state['requests'].get(entry.custom_id)
+        if info is None or entry.custom_id in applied:
+            continue
+        if entry.result.type != "succeeded":
+            print(f"{entry.custom_id}: {entry.result.type}")
+            failed.append(entry.custom_id)
+            continue
+        if apply_result(entry, info, store, blobs, cache, model):
+            state['applied'].append(entry.custom_id)
+            applied.add(entry.custom_id)
+            save_state(state, state_file)
+
+    print(f"Saved {len(applied)} of {len(state['requests'])} lessons")
+    if failed:
+        # Keep the state so running the same command again retries just these
+        state['failed'] = failed
+        save_state(state, state_file)
+        print(f"{len(failed)} lessons failed; run again to retry them")
+    else:
+        os.remove(state_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate lessons for every student on a module")
+    parser.add_argument("pdf_dir", help="Directory of lecture PDFs")
+    parser.add_argument("student_ids", nargs="*", help="Student IDs to generate lessons for")
+    parser.add_argument("--all", action="store_true", help="Generate for every student")
+    parser.add_argument("--db", default="users.db")
+    parser.add_argument("--state", default="batch_state.json", help="Progress file used to resume after a crash")
+    parser.add_argument("--poll", type=int, default=30, help="Seconds between status checks")
+    parser.add_argument("--local", action="store_true", help="Answer requests locally instead of calling the API")
+    args = parser.parse_args(argv)
+
+    store = UserStore(args.db)
+    if store.count() == 0 and os.path.exists("users_database.json"):
+        migrate_json("users_database.json", store, BlobStore("blobs"))
+    student_ids = list(store.all()) if args.all else args.student_ids
+    if not student_ids and not os.path.exists(args.state):
+        parser.error("give some student IDs or --all")
+
+    if args.local:
+        batches = LocalBatches()
+    else:
+        from ai_client import get_client
+        from dotenv import load_dotenv
+        load_dotenv()
+        batches = get_client().messages.batches
+
+    run(args.pdf_dir, student_ids, batches, store, BlobStore("blobs"), LessonCache("lesson_cache.db"),
+        args.state, poll_seconds=args.poll)
+
+
+if __name__ == "__main__":
+    main()
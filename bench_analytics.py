@@ -0,0 +1,92 @@
+"""Compare analytics.Cohort with the same statistics computed by looping over records.
+
+Usage:
+    python bench_analytics.py                # 1k, 10k and 50k generated students
+    python bench_analytics.py 100000
+"""
+import random
+import sys
+import time
+from datetime import datetime
+
+from analytics import AT_RISK, ENGAGEMENT, GRADE_BINS, PERCENTILES, Cohort
+from gen import generate_student_data
+
+SIZES = [1000, 10000, 50000]
+
+
+def percentile(values, q):
+    """Linear interpolation between closest ranks, as np.percentile does"""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def loop_stats(students, now):
+    """Everything analytics.report prints, one student at a time"""
+    by_subject = {}
+    bands = {}
+    for s in students:
+        average = sum(s['grades'].values()) / len(s['grades'])
+        by_subject.setdefault(s['subject'], []).append(average)
+        counts = bands.setdefault(s['subject'], [0] * (len(GRADE_BINS) - 1))
+        for grade in s['grades'].values():
+            for band, (lo, hi) in enumerate(zip(GRADE_BINS, GRADE_BINS[1:])):
+                if lo <= grade < hi:
+                    counts[band] += 1
+    grades = {}
+    for subject, averages in by_subject.items():
+        mean = sum(averages) / len(averages)
+        grades[subject] = {
+            'students': len(averages),
+            'mean': mean,
+            'median': percentile(averages, 50),
+        }
+    engagement = {
+        name: {q: percentile([s['engagement'][name] for s in students], q) for q in PERCENTILES}
+        for name in ENGAGEMENT
+    }
+    at_risk = 0
+    for s in students:
+        average = sum(s['grades'].values()) / len(s['grades'])
+        days = (now - datetime.fromisoformat(s['engagement']['last_login'])).total_seconds() / 86400
+        if (average < 50 or s['engagement']['attendance_rate'] < 70
+                or s['engagement']['assignment_submission_rate'] < 80
+                or s['behavior_pattern'] == "Declining" or days > 5):
+            at_risk += 1
+    return grades, bands, engagement, at_risk
+
+
+def cohort_stats(students, now):
+    cohort = Cohort(students, now)
+    return cohort, (cohort.grades_by_subject(), cohort.grade_distribution(),
+                    cohort.engagement_percentiles(), cohort.at_risk())
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{len(AT_RISK)} at-risk rules, {len(PERCENTILES)} percentiles\n")
+    print(f"{'students':>9} {'loops (s)':>10} {'load (s)':>9} {'query (s)':>10} {'speedup':>8}")
+    for size in sizes:
+        random.seed(size)
+        students = generate_student_data(size)
+        now = datetime.now()
+        (grades, bands, engagement, at_risk), loops = timed(loop_stats, students, now)
+        cohort, load = timed(Cohort, students, now)
+        (c_grades, c_bands, c_engagement, c_risk), query = timed(
+            lambda: (cohort.grades_by_subject(), cohort.grade_distribution(),
+                     cohort.engagement_percentiles(), cohort.at_risk())
+        )
+        # Both paths must agree before their timings mean anything
+        assert c_bands == bands and c_risk['any'] == at_risk
+        assert all(abs(c_grades[s]['mean'] - grades[s]['mean']) < 1e-9 for s in grades)
+        assert all(abs(c_engagement[m][q] - engagement[m][q]) < 1e-9 for m in engagement for q in PERCENTILES)
+        print(f"{size:>9} {loops:>10.3f} {load:>9.3f} {query:>10.4f} {loops / query:>7.0f}x")
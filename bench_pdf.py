@@ -0,0 +1,102 @@
+"""Compare sending lecture PDFs whole with sending extracted text plus vision pages.
+
+Usage:
+    python bench_pdf.py lectures/                 # every PDF in a folder
+    python bench_pdf.py a.pdf b.pdf --generate    # also time a real lesson in each mode
+
+Token counts come from the count_tokens API when ANTHROPIC_API_KEY is set.
+Otherwise they are estimated: about 4 characters per text token, plus
+PAGE_IMAGE_TOKENS for each page sent as an image.
+"""
+import argparse
+import base64
+import hashlib
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+import pdf_text
+from pdf_text import PdfTextCache, document_parts
+from prompts import lesson_request
+
+PAGE_IMAGE_TOKENS = 1600
+MODEL = "claude-sonnet-4-20250514"
+STUDENT = {'name': "Sam", 'age': 20, 'subject': "Computer Science", 'year': 2}
+
+
+def estimate_tokens(pages, text_mode):
+    chars = sum(len(page['text']) for page in pages)
+    images = sum(1 for page in pages if page['vision']) if text_mode else len(pages)
+    return chars // 4 + images * PAGE_IMAGE_TOKENS
+
+
+def count_tokens(client, request):
+    return client.messages.count_tokens(model=request['model'], messages=request['messages']).input_tokens
+
+
+def generate(client, request):
+    start = time.perf_counter()
+    message = client.messages.create(**request)
+    return time.perf_counter() - start, message.usage.input_tokens
+
+
+def pdf_paths(args):
+    for path in args:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith('.pdf'))
+        else:
+            yield path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="+", help="PDF files or folders of PDFs")
+    parser.add_argument("--generate", action="store_true", help="Time a full lesson in each mode (uses the API)")
+    args = parser.parse_args()
+    if pdf_text.pypdf is None:
+        parser.exit(1, "pypdf is not installed\n")
+
+    load_dotenv()
+    client = None
+    if os.getenv('ANTHROPIC_API_KEY'):
+        from ai_client import get_client
+        client = get_client()
+    elif args.generate:
+        parser.exit(1, "--generate needs ANTHROPIC_API_KEY\n")
+
+    source = "count_tokens" if client else "estimated"
+    print(f"Input tokens: {source}\n")
+    print(f"{'pdf':<32} {'pages':>5} {'vision':>6} {'extract (s)':>11} {'cached (s)':>10} "
+          f"{'whole':>8} {'text':>8} {'saved':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfTextCache(tmp)
+        for path in pdf_paths(args.pdfs):
+            with open(path, 'rb') as f:
+                pdf_bytes = f.read()
+            digest = hashlib.sha256(pdf_bytes).hexdigest()
+
+            start = time.perf_counter()
+            pages = cache.pages(digest, pdf_bytes)
+            extract = time.perf_counter() - start
+            start = time.perf_counter()
+            cache.pages(digest, pdf_bytes)
+            cached = time.perf_counter() - start
+
+            whole_request = lesson_request(MODEL, STUDENT, base64.b64encode(pdf_bytes).decode('utf-8'))
+            vision_base64, lecture_text, vision_pages = document_parts(pdf_bytes, digest, cache)
+            text_request = lesson_request(MODEL, STUDENT, vision_base64, pdf_text=lecture_text,
+                                          vision_pages=vision_pages)
+            if client:
+                whole, text = count_tokens(client, whole_request), count_tokens(client, text_request)
+            else:
+                whole, text = estimate_tokens(pages, False), estimate_tokens(pages, True)
+            vision = sum(1 for page in pages if page['vision'])
+            print(f"{os.path.basename(path)[:32]:<32} {len(pages):>5} {vision:>6} {extract:>11.2f} {cached:>10.3f} "
+                  f"{whole:>8} {text:>8} {1 - text / whole:>6.0%}")
+
+            if args.generate:
+                for mode, request in (("whole", whole_request), ("text", text_request)):
+                    seconds, tokens = generate(client, request)
+                    print(f"    {mode:<6} lesson in {seconds:.1f}s, {tokens} input tokens")
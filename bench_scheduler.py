@@ -0,0 +1,61 @@
+"""Time the local scheduler on generated students and check every plan keeps its rules.
+
+Usage:
+    python bench_scheduler.py                # 1k, 10k and 50k generated students
+    python bench_scheduler.py 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from blobstore import BlobStore
+from gen import lesson_pool, make_user
+from ids import format_student_id
+from scheduler import EARLIEST, POMODORO, Week, schedule, to_minutes
+from study_plan import plan_cohort
+
+SIZES = [1000, 10000, 50000]
+
+
+def check(user, sessions, later):
+    """The rules from scheduler.py, checked one plan at a time"""
+    week = Week(user)
+    assert sum(s['minutes'] for s in sessions) <= week.budget
+    for s in sessions:
+        assert EARLIEST <= to_minutes(s['slot']) and to_minutes(s['end']) <= week.stop, s
+        if week.focus == POMODORO[0]:
+            assert s['breaks'] == (s['minutes'] - 1) // POMODORO[0]
+    for day in week.used:
+        today = [s for s in sessions if s['day'] == day]
+        assert sum(s['minutes'] for s in today) <= max([week.daily] + [s['minutes'] for s in today])
+        # A day only starts before the preferred time when it would otherwise run into bedtime
+        if today and to_minutes(today[0]['slot']) < week.preferred:
+            assert to_minutes(today[0]['slot']) == EARLIEST or to_minutes(today[-1]['end']) == week.stop
+    assert (sessions, later) == schedule(user, user['materials'])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=SIZES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lessons = lesson_pool(0, BlobStore(tmp))
+    print(f"{'students':>9} {'sessions':>9} {'schedule (s)':>12} {'per second':>11} "
+          f"{'plans (s)':>10} {'per second':>11}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        users = [make_user(rng, format_student_id(2025, n), lessons) for n in range(1, size + 1)]
+        results, seconds = timed(lambda: [schedule(user, user['materials']) for user in users])
+        for user, (sessions, later) in zip(users, results):
+            check(user, sessions, later)
+        _, planning = timed(lambda: list(plan_cohort(users)))
+        sessions = sum(len(s) for s, _ in results)
+        print(f"{size:>9} {sessions:>9} {seconds:>12.3f} {size / seconds:>11,.0f} {planning:>10.3f} {size / planning:>11,.0f}")
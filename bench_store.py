@@ -0,0 +1,79 @@
+"""Compare user-store formats by save and load time on synthetic databases.
+
+Usage:
+    python bench_store.py                    # 1k, 10k and 100k users, every format available
+    python bench_store.py 5000 orjson json   # just these
+
+"indent-json" is the old users_database.json path: one json.dump(indent=2)
+of every user. It is the export format now, measured here for comparison.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from gen import TOPICS, make_user
+from ids import format_student_id
+from serializers import SERIALIZERS, get_serializer
+from storage import UserStore
+
+SIZES = [1000, 10000, 100000]
+
+
+def synthetic_users(count, seed):
+    """LearnWell-shaped users from gen.py; lesson bodies aren't part of the record, so only digests are needed"""
+    rng = random.Random(seed)
+    lessons = [(topic, f"{rng.getrandbits(256):064x}", rng.randint(3000, 12000)) for topic in TOPICS]
+    return [make_user(rng, format_student_id(2025, i), lessons) for i in range(1, count + 1)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_store(name, users, tmp):
+    db_file = os.path.join(tmp, f"{name}-{len(users)}.db")
+    store = UserStore(db_file, serializer=get_serializer(name))
+    save = timed(lambda: store.put_many(users))
+    # A fresh store has an empty record cache, so every record is decoded
+    fresh = UserStore(db_file, serializer=get_serializer(name))
+    load = timed(fresh.all)
+    store._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return save, load, os.path.getsize(db_file)
+
+
+def bench_indented_json(users, tmp):
+    json_file = os.path.join(tmp, f"users-{len(users)}.json")
+    by_id = {u['student_id']: u for u in users}
+
+    def save():
+        with open(json_file, 'w') as f:
+            json.dump(by_id, f, indent=2)
+
+    def load():
+        with open(json_file, 'r') as f:
+            json.load(f)
+
+    return timed(save), timed(load), os.path.getsize(json_file)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES
+    names = [arg for arg in sys.argv[1:] if not arg.isdigit()] or list(SERIALIZERS)
+    print(f"{'users':>7} {'format':<12} {'save (s)':>9} {'load (s)':>9} {'size (MB)':>10}")
+    for size in sizes:
+        users = synthetic_users(size, seed=size)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in names:
+                try:
+                    save, load, nbytes = bench_store(name, users, tmp)
+                except Exception as e:
+                    print(f"{size:>7} {name:<12} unavailable: {e}")
+                    continue
+                print(f"{size:>7} {name:<12} {save:>9.2f} {load:>9.2f} {nbytes / 1e6:>10.1f}")
+            save, load, nbytes = bench_indented_json(users, tmp)
+            print(f"{size:>7} {'indent-json':<12} {save:>9.2f} {load:>9.2f} {nbytes / 1e6:>10.1f}")
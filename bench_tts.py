@@ -0,0 +1,57 @@
+"""Compare text-to-speech engines by latency per 1,000 characters.
+
+Usage:
+    python bench_tts.py                  # every engine that can start here
+    python bench_tts.py espeak piper     # just these
+"""
+import json
+import sys
+import time
+
+from audio import split_sentences, strip_markdown
+from tts_engines import ENGINES, get_engine
+
+
+def sample_text():
+    """A real lesson from the bundled database, or filler text if there isn't one"""
+    try:
+        with open("users_database.json", 'r') as f:
+            users = json.load(f)
+        for user in users.values():
+            for material in user.get('materials', []):
+                return strip_markdown(material['lesson'])
+    except (OSError, ValueError):
+        pass
+    return "This lesson covers the key concepts from your lecture. " * 40
+
+
+def bench(engine, chunks, rounds=3):
+    # One warm-up call so process start-up and model loading aren't counted
+    engine.synthesize(chunks[0])
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for chunk in chunks:
+            engine.synthesize(chunk)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(ENGINES)
+    text = sample_text()
+    chunks = split_sentences(text)
+    chars = sum(len(chunk) for chunk in chunks)
+    print(f"{chars} characters in {len(chunks)} chunks\n")
+    print(f"{'engine':<8} {'total (s)':>10} {'ms / 1k chars':>14}")
+    for name in names:
+        try:
+            engine = get_engine(name)
+            seconds = bench(engine, chunks)
+        except Exception as e:
+            print(f"{name:<8} unavailable: {e}")
+            continue
+        print(f"{name:<8} {seconds:>10.2f} {seconds * 1000 / chars * 1000:>14.0f}")
+        if hasattr(engine, 'close'):
+            engine.close()
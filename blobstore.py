@@ -0,0 +1,87 @@
+import base64
+import hashlib
+import os
+import tempfile
+
+from fileio import atomic_write
+
+
+class BlobStore:
+    """Content-addressed file store for uploaded PDFs, keyed by SHA-256"""
+
+    def __init__(self, root="blobs"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store bytes once and return (digest, size)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, data)
+        return digest, len(data)
+
+    def put_stream(self, f, max_bytes=None, chunk_size=1024 * 1024):
+        """Store a file object chunk by chunk, hashing as it goes; returns (digest, size).
+
+        Raises ValueError as soon as more than max_bytes have been read.
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"File is larger than {max_bytes // (1024 * 1024)}MB")
+                    sha256.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            digest = sha256.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, size
+
+    def read(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+
+def externalize_pdf(material, blobs):
+    """Move an inline base64 'pdf_content' out of a material record into the blob store"""
+    if 'pdf_content' not in material:
+        return False
+    digest, size = blobs.put(base64.b64decode(material.pop('pdf_content')))
+    material['pdf_sha256'] = digest
+    material['pdf_size'] = size
+    return True
+
+
+def externalize_lesson(material, blobs):
+    """Move the lesson body out of a material record, leaving its digest and length"""
+    if 'lesson' not in material:
+        return False
+    lesson = material.pop('lesson')
+    material['lesson_sha256'], _ = blobs.put(lesson.encode('utf-8'))
+    material['lesson_chars'] = len(lesson)
+    return True
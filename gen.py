@@ -1,9 +1,23 @@
+import argparse
 import json
+import os
 import random
+import time
 from datetime import datetime, timedelta
+from itertools import chain
+from multiprocessing import Pool
+
+from blobstore import BlobStore
+from ids import StudentIdAllocator, format_student_id
+from jsonstream import NDJSON_SUFFIXES, write_ndjson
+from storage import UserStore
 
 def generate_student_data(num_students=5):
     """Generate fake student data for testing"""
+    return list(iter_student_data(num_students))
+
+def iter_student_data(num_students=5):
+    """Yield fake students one at a time, so large cohorts can be streamed to disk"""
     
     subjects = ["Computer Science", "Mathematics", "Physics", "Engineering", "Business"]
     modules = {
@@ -31,8 +45,6 @@ def generate_student_data(num_students=5):
     
     behaviors = ["Consistent", "Improving", "Declining", "Irregular", "Excellent"]
     
-    students = []
-    
     for i in range(num_students):
         student_id = f"STU{1000 + i}"
         name = f"Student_{i+1}"
@@ -55,10 +67,10 @@ def generate_student_data(num_students=5):
         # Remove duplicate skills and add proficiency levels
         unique_skills = list(set(transferrable_skills))
         skills_with_proficiency = {}
+        # Proficiency correlates somewhat with grades
+        avg_grade = sum(grades.values()) / len(grades)
+        base_proficiency = (avg_grade - 40) / 55  # Normalize to 0-1
         for skill in unique_skills:
-            # Proficiency correlates somewhat with grades
-            avg_grade = sum(grades.values()) / len(grades)
-            base_proficiency = (avg_grade - 40) / 55  # Normalize to 0-1
             proficiency = min(100, int((base_proficiency + random.uniform(-0.1, 0.1)) * 100))
             skills_with_proficiency[skill] = proficiency
         
@@ -79,28 +91,219 @@ def generate_student_data(num_students=5):
             "subject": subject,
             "year": year,
             "grades": grades,
-            "average_grade": round(sum(grades.values()) / len(grades), 2),
+            "average_grade": round(avg_grade, 2),
             "transferrable_skills": skills_with_proficiency,
             "behavior_pattern": behavior,
             "engagement": engagement
         }
         
-        students.append(student)
-    
-    return students
+        yield student
 
 def save_student_data(students, filename="student_data.json"):
-    """Save student data to JSON file"""
-    with open(filename, 'w') as f:
-        json.dump(students, f, indent=2)
-    print(f"Generated data for {len(students)} students and saved to {filename}")
+    """Save student data to JSON file, or one student per line for .ndjson/.jsonl"""
+    if filename.endswith(NDJSON_SUFFIXES):
+        count = write_ndjson(students, filename)
+    else:
+        students = list(students)
+        count = len(students)
+        with open(filename, 'w') as f:
+            json.dump(students, f, indent=2)
+    print(f"Generated data for {count} students and saved to {filename}")
+
+# ============================================
+# LOAD-TEST FIXTURES: LearnWell-shaped users
+# ============================================
+
+SUBJECTS = ["Computer Science", "Engineering", "Business", "Psychology", "Biology", "Mathematics",
+            "Medicine", "Law", "Education", "Nursing", "Physics", "Chemistry"]
+LEARNING_STYLES = [
+    "👁️ Visual - I learn best with pictures, diagrams, and videos",
+    "👂 Auditory - I learn best by listening and discussing",
+    "📖 Reading/Writing - I learn best by reading and taking notes",
+    "🤲 Kinesthetic - I learn best by doing and practicing"
+]
+STUDY_TIMES = ["🌅 Early Morning", "☀️ Mid Morning", "🌤️ Afternoon", "🌆 Evening", "🌙 Night"]
+SLEEP_QUALITY = ["Very Poor", "Poor", "Fair", "Good", "Excellent"]
+CHALLENGE_TYPES = ["ADHD", "Dyslexia", "Dyscalculia", "Dysgraphia", "Autism Spectrum", "Anxiety Disorder",
+                   "Depression", "Visual Impairment", "Hearing Impairment", "Chronic Pain/Illness"]
+SEVERITY = ["Very Little", "Somewhat", "Moderate", "Significant", "Severe"]
+BARRIERS = ["Focus & concentration", "Time management", "Test anxiety", "Procrastination",
+            "Understanding material", "Memory", "Motivation", "Health issues", "Personal problems",
+            "Financial stress", "Language barriers"]
+ACCESSIBILITY = ["Larger text", "High contrast", "Screen reader support", "Color blind friendly",
+                 "Audio/captions", "Simplified language", "Frequent breaks"]
+TOPICS = ["Domain Name Service", "Sorting Algorithms", "Linear Regression", "Cell Biology", "Contract Law",
+          "Thermodynamics", "Marketing Mix", "Cognitive Biases", "Organic Reactions", "Graph Theory"]
+
+LESSON_POOL = 64
+CHUNK_USERS = 10000
+WRITE_BATCH = 1000
+
+
+def make_lesson(rng, topic):
+    """Markdown in the shape teach_pdf produces, 3-12k characters long"""
+    sections = [f"# 📚 Learning: {topic}\n\n## 🎯 What You'll Learn\n"]
+    sections += [f"- Key idea {n + 1} about {topic}\n" for n in range(rng.randint(3, 5))]
+    while sum(len(s) for s in sections) < rng.randint(3000, 12000):
+        sections.append(f"\n## 📖 Part {len(sections)}\n\n" + " ".join(
+            f"This explains how {topic.lower()} works in step {n + 1}." for n in range(rng.randint(10, 30))
+        ) + "\n\n💡 Remember: take it one step at a time.\n")
+    sections.append("\n## ✅ Quick Check\n\n1. What is the main idea?\n\n## 🚀 Next Steps\n\nPractice!\n")
+    return "".join(sections)
+
+
+def lesson_pool(seed, blobs, size=LESSON_POOL):
+    """A fixed set of lessons in the blob store that generated materials point at"""
+    rng = random.Random(f"{seed}:lessons")
+    pool = []
+    for n in range(size):
+        topic = TOPICS[n % len(TOPICS)]
+        lesson = make_lesson(rng, topic)
+        digest, _ = blobs.put(lesson.encode('utf-8'))
+        pool.append((topic, digest, len(lesson)))
+    return pool
+
+
+def make_user(rng, student_id, lessons, max_materials=12):
+    """One user record as LearnWell saves it after signup and some uploads"""
+    name = f"Student {student_id[-6:]}"
+    created = datetime(2025, 1, 1) + timedelta(minutes=rng.randint(0, 60 * 24 * 300))
+    has_challenge = rng.random() < 0.3
+    challenge = {'has_challenge': False}
+    if has_challenge:
+        challenge = {
+            'has_challenge': True,
+            'types': rng.sample(CHALLENGE_TYPES, k=rng.randint(1, 2)),
+            'severity': rng.choice(SEVERITY),
+            'specific_challenges': "",
+            'what_helps': ""
+        }
+    materials = []
+    for n in range(rng.randint(0, max_materials)):
+        topic, digest, chars = rng.choice(lessons)
+        materials.append({
+            'id': f"{rng.getrandbits(48):012x}",
+            'name': f"Lecture {n + 1} - {topic}.pdf",
+            'lesson_sha256': digest,
+            'lesson_chars': chars,
+            'pdf_sha256': f"{rng.getrandbits(256):064x}",
+            'pdf_size': rng.randint(100000, 5000000),
+            'date': (created + timedelta(days=7 * n)).isoformat(),
+            'done': rng.random() < 0.5
+        })
+    return {
+        'name': name,
+        'email': f"{name.lower().replace(' ', '.')}@example.com",
+        'age': rng.randint(17, 35),
+        'year': rng.randint(1, 5),
+        'subject': rng.choice(SUBJECTS),
+        'learning_style': rng.choice(LEARNING_STYLES),
+        'study_time': rng.choice(STUDY_TIMES),
+        'study_hours': rng.randint(5, 40),
+        'anxiety': rng.randint(1, 10),
+        'stress': rng.randint(1, 10),
+        'motivation': rng.randint(1, 10),
+        'depression': rng.randint(1, 10),
+        'sleep_hours': rng.randint(3, 12),
+        'sleep_quality': rng.choice(SLEEP_QUALITY),
+        'challenge': challenge,
+        'goal': "Pass my exams",
+        'barriers': rng.sample(BARRIERS, k=rng.randint(0, 3)),
+        'accessibility': rng.sample(ACCESSIBILITY, k=rng.randint(0, 2)),
+        'additional_info': "",
+        'student_id': student_id,
+        'created': created.isoformat(),
+        'materials': materials,
+        'completed': sum(1 for m in materials if m['done']),
+        'study_streak': rng.randint(0, 30),
+        'last_study': None
+    }
+
+
+_worker = {}
+
+
+def _init_worker(db_file, lessons):
+    # Workers only write, so they don't load the login index or cache what they write
+    _worker['store'] = UserStore(db_file, write_only=True) if db_file else None
+    _worker['lessons'] = lessons
+
+
+def _generate_chunk(task):
+    """Build one chunk of users; with a store, write them and return only the count"""
+    seed, index, year, first, count = task
+    # Seeded per chunk, so the output doesn't depend on which worker ran it
+    rng = random.Random(f"{seed}:{index}")
+    users = [make_user(rng, format_student_id(year, n), _worker['lessons']) for n in range(first, first + count)]
+    store = _worker['store']
+    if store is None:
+        return users
+    for start in range(0, len(users), WRITE_BATCH):
+        store.put_many(users[start:start + WRITE_BATCH])
+    return len(users)
+
+
+def _tasks(seed, year, first, count):
+    for index, start in enumerate(range(0, count, CHUNK_USERS)):
+        yield seed, index, year, first + start, min(CHUNK_USERS, count - start)
+
+
+def write_json(chunks, json_file):
+    """Stream chunks of users into a users_database.json-shaped file"""
+    written = 0
+    with open(json_file, 'w') as f:
+        f.write("{")
+        for users in chunks:
+            for user in users:
+                f.write(",\n" if written else "\n")
+                f.write(f"{json.dumps(user['student_id'])}: {json.dumps(user, ensure_ascii=False)}")
+                written += 1
+        f.write("\n}\n")
+    return written
+
+
+def generate_users(count, db_file="users.db", json_file=None, seed=0, workers=None, blobs_dir="blobs"):
+    """Generate count LearnWell users in parallel, into the user store or a JSON file"""
+    lessons = lesson_pool(seed, BlobStore(blobs_dir))
+    # IDs come from the store's own sequence, so fixtures never collide with real students. A JSON
+    # file reserves them from db_file too: it is imported there, and later signups continue after it
+    year, first, _ = StudentIdAllocator(db_file).reserve_range(count)
+    target_db = None if json_file else db_file
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(target_db, lessons)) as pool:
+        tasks = _tasks(seed, year, first, count)
+        if json_file and json_file.endswith(NDJSON_SUFFIXES):
+            return write_ndjson(chain.from_iterable(pool.imap(_generate_chunk, tasks)), json_file)
+        if json_file:
+            return write_json(pool.imap(_generate_chunk, tasks), json_file)
+        return sum(pool.imap_unordered(_generate_chunk, tasks))
+
 
 if __name__ == "__main__":
-    # Generate data for 5 students
-    students = generate_student_data(5)
-    save_student_data(students)
+    parser = argparse.ArgumentParser(description="Generate test data")
+    parser.add_argument("--users", type=int, help="Generate this many LearnWell users for load testing")
+    parser.add_argument("--db", default="users.db",
+                        help="User store to write into, or with --json to reserve IDs from (default: users.db)")
+    parser.add_argument("--json", help="Write a users_database.json-shaped file instead of the store "
+                                       "(NDJSON, one user per line, if it ends in .ndjson or .jsonl)")
+    parser.add_argument("--students", type=int, default=5, help="How many student_data.json students to generate")
+    parser.add_argument("--out", default="student_data.json",
+                        help="Where to save them; .ndjson or .jsonl streams one student per line")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Processes to use (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.users:
+        start = time.perf_counter()
+        count = generate_users(args.users, args.db, args.json, args.seed, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"Generated {count} users into {args.json or args.db} in {elapsed:.1f}s ({count / elapsed:,.0f} users/s)")
+    elif args.out.endswith(NDJSON_SUFFIXES):
+        save_student_data(iter_student_data(args.students), args.out)
+    else:
+        students = generate_student_data(args.students)
+        save_student_data(students, args.out)
     
-    # Display summary
-    print("\nGenerated Students:")
-    for student in students:
-        print(f"- {student['name']} ({student['student_id']}): {student['subject']}, Year {student['year']}, Avg: {student['average_grade']}%")
\ No newline at end of file
+        # Display summary
+        print("\nGenerated Students:")
+        for student in students[:10]:
+            print(f"- {student['name']} ({student['student_id']}): {student['subject']}, Year {student['year']}, Avg: {student['average_grade']}%")
\ No newline at end of file
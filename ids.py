@@ -0,0 +1,69 @@
+import re
+from datetime import datetime
+
+from storage import ThreadConnections
+
+
+def format_student_id(year, number):
+    # Four digits as before; numbers past 9999 simply get longer, they never collide
+    return f"STU{year}{number:04d}"
+
+
+class StudentIdAllocator:
+    """Hands out student IDs from a persisted per-year sequence.
+
+    The sequence lives next to the users table, and every allocation is one
+    IMMEDIATE transaction, so concurrent sessions and processes never get the
+    same number, and IDs of deleted users are never reused.
+    """
+
+    def __init__(self, db_file="users.db"):
+        self.db_file = db_file
+        self._conn = ThreadConnections(db_file)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+
+    def _highest_existing(self, conn, year):
+        # Start after IDs that were handed out before the sequence existed
+        has_users = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+        ).fetchone()
+        if not has_users:
+            return 0
+        pattern = re.compile(rf"^STU{year}(\d+)$")
+        highest = 0
+        for (student_id,) in conn.execute("SELECT student_id FROM users WHERE student_id LIKE ?", (f"STU{year}%",)):
+            match = pattern.match(student_id)
+            if match:
+                highest = max(highest, int(match.group(1)))
+        return highest
+
+    def reserve_range(self, count, year=None):
+        """Atomically reserve count consecutive numbers; returns (year, first, last)"""
+        year = year or datetime.now().year
+        name = f"student_id:{year}"
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+            last = row[0] if row else self._highest_existing(conn, year)
+            conn.execute(
+                "INSERT OR REPLACE INTO sequences (name, value) VALUES (?, ?)", (name, last + count)
+            )
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        return year, last + 1, last + count
+
+    def reserve(self, count, year=None):
+        """Atomically reserve count consecutive IDs, e.g. for a batch import"""
+        year, first, last = self.reserve_range(count, year)
+        return [format_student_id(year, number) for number in range(first, last + 1)]
+
+    def next_id(self, year=None):
+        return self.reserve(1, year)[0]
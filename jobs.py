@@ -0,0 +1,134 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import ThreadConnections
+
+ACTIVE = ('queued', 'running')
+_ACTIVE_PARAMS = ", ".join("?" * len(ACTIVE))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Bounded worker pool for slow model calls, with job state kept in SQLite.
+
+    Finished jobs stay in the table until the dashboard collects them, so a
+    rerun or a fresh session for the same student still picks up the result.
+    """
+
+    def __init__(self, db_file="jobs.db", max_workers=4):
+        self.db_file = db_file
+        self._conn = ThreadConnections(db_file)
+        self._partial = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="learnwell-job")
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                student_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                pid INTEGER NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_student ON jobs (student_id, status)")
+        self._fail_orphans()
+
+    def _fail_orphans(self):
+        # Jobs owned by a process that has gone away can never finish
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT DISTINCT pid FROM jobs WHERE status IN ({_ACTIVE_PARAMS})", ACTIVE
+        ).fetchall()
+        for (pid,) in rows:
+            if pid == os.getpid() or not _pid_alive(pid):
+                conn.execute(
+                    f"UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE pid = ? AND status IN ({_ACTIVE_PARAMS})",
+                    ("Interrupted by a restart. Please try again.", time.time(), pid, *ACTIVE)
+                )
+
+    def _set(self, job_id, **fields):
+        fields['updated'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._conn().execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, student_id, kind, params, fn, *args):
+        """Queue fn(*args) and return its job id straight away.
+
+        fn may return a string or an iterator of text chunks.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, student_id, kind, params, status, pid, created, updated) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, student_id, kind, json.dumps(params), os.getpid(), now, now)
+        )
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        self._set(job_id, status='running')
+        try:
+            result = fn(*args)
+            if not isinstance(result, str):
+                # Streaming job: keep the text so far in memory for polling
+                chunks = self._partial[job_id] = []
+                for chunk in result:
+                    chunks.append(chunk)
+                result = "".join(chunks)
+        except Exception as e:
+            self._set(job_id, status='failed', error=str(e))
+        else:
+            self._set(job_id, status='done', result=result)
+        finally:
+            self._partial.pop(job_id, None)
+
+    def partial(self, job_id):
+        """Text a streaming job has produced so far"""
+        return "".join(self._partial.get(job_id, ()))
+
+    def _row(self, row):
+        keys = ('id', 'student_id', 'kind', 'params', 'status', 'result', 'error', 'created', 'updated')
+        job = dict(zip(keys, row))
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def get(self, job_id):
+        row = self._conn().execute(
+            "SELECT id, student_id, kind, params, status, result, error, created, updated FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def pending(self, student_id):
+        """Jobs for a student that are still running or waiting to be collected"""
+        rows = self._conn().execute(
+            "SELECT id, student_id, kind, params, status, result, error, created, updated FROM jobs "
+            "WHERE student_id = ? ORDER BY created",
+            (student_id,)
+        ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def collect(self, job_id):
+        """Claim a finished job by deleting it; True only for the one caller that got it.
+
+        Several sessions of the same student can see the same finished job,
+        so only the caller this returns True for should save its result.
+        """
+        return self._conn().execute("DELETE FROM jobs WHERE id = ? RETURNING id", (job_id,)).fetchone() is not None
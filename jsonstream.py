@@ -0,0 +1,147 @@
+"""Read large JSON files one record at a time.
+
+Three layouts are understood:
+    [ {...}, {...} ]            a top-level array, e.g. student_data.json
+    { "id": {...}, ... }        a top-level object, e.g. users_database.json
+    {...}\\n{...}\\n              NDJSON, one record per line (.ndjson or .jsonl)
+
+Only one record is held in memory at a time, plus a read buffer.
+"""
+import json
+
+CHUNK_CHARS = 1024 * 1024
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# A value cut off by the end of the buffer fails within this many characters
+# of the end (a partial literal or \uXXXX escape); strings report their start
+_TRUNCATED = 16
+
+
+class _Reader:
+    """A growing text buffer over a file, consumed from the front"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, chars=CHUNK_CHARS):
+        chunk = self.f.read(chars)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays about one chunk long
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or '' at the end of the file"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next JSON value, reading more of the file until it is complete.
+
+        Errors before the end of the buffer are raised at once. Each retry
+        reads twice as much as the last, so a value that spans many chunks
+        is decoded a logarithmic number of times rather than once per chunk.
+        """
+        self.peek()
+        chars = CHUNK_CHARS
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self.buf) - _TRUNCATED or e.msg.startswith("Unterminated string")
+                if truncated and self.fill(chars):
+                    chars *= 2
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill(chars):
+                chars *= 2
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(f):
+    """Yield the elements of a top-level JSON array"""
+    reader = _Reader(f)
+    reader.expect('[')
+    if reader.peek() == ']':
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(',]') == ']':
+            return
+
+
+def iter_object(f):
+    """Yield (key, value) pairs of a top-level JSON object"""
+    reader = _Reader(f)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def iter_ndjson(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(path, key_field=None):
+    """Yield every record in a JSON array, JSON object or NDJSON file.
+
+    For object files, records are the values; key_field, if given, is set
+    from the key on records that don't carry it already.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(NDJSON_SUFFIXES):
+            yield from iter_ndjson(f)
+            return
+        first = _Reader(f).peek()
+        f.seek(0)
+        if first == '[':
+            yield from iter_array(f)
+        elif first == '{':
+            for key, record in iter_object(f):
+                if key_field is not None:
+                    record.setdefault(key_field, key)
+                yield record
+        elif first:
+            raise ValueError(f"{path} is not a JSON array, object or NDJSON file")
+
+
+def write_ndjson(records, path):
+    """Write records one per line; returns how many were written"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,114 @@
+import hashlib
+import re
+import threading
+import time
+
+from prompts import NAME_TOKEN
+from storage import ThreadConnections
+
+# Context lines that change per student but barely affect the lesson
+_IGNORED_CONTEXT = re.compile(r"^- (Name|Age):.*$", re.MULTILINE)
+
+
+def context_digest(student_context):
+    """Digest of build_student_context output with per-student noise removed"""
+    text = _IGNORED_CONTEXT.sub("", student_context)
+    text = " ".join(text.lower().split())
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def lesson_key(pdf_digest, model, student_context):
+    return hashlib.sha256(f"{pdf_digest}:{model}:{context_digest(student_context)}".encode('utf-8')).hexdigest()
+
+
+def personalize(lesson, student_name):
+    return lesson.replace(NAME_TOKEN, student_name)
+
+
+def personalize_stream(chunks, student_name):
+    """personalize for streamed text, even when the token arrives split across chunks"""
+    keep = len(NAME_TOKEN) - 1
+    pending = ""
+    for chunk in chunks:
+        pending = personalize(pending + chunk, student_name)
+        if len(pending) > keep:
+            yield pending[:-keep]
+            pending = pending[-keep:]
+    if pending:
+        yield pending
+
+
+class LessonCache:
+    """Disk-backed lesson cache with TTL, LRU eviction and a size cap"""
+
+    def __init__(self, db_file="lesson_cache.db", max_bytes=200 * 1024 * 1024, ttl_days=30):
+        self.db_file = db_file
+        self.max_bytes = max_bytes
+        self.ttl = ttl_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = ThreadConnections(db_file)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS lessons (
+                key TEXT PRIMARY KEY,
+                lesson TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, student_name):
+        """Return the cached lesson personalised for student_name, or None"""
+        conn = self._conn()
+        row = conn.execute("SELECT lesson, created FROM lessons WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute("DELETE FROM lessons WHERE key = ?", (key,))
+            self._count(False)
+            return None
+        conn.execute("UPDATE lessons SET last_used = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return personalize(row[0], student_name)
+
+    def put(self, key, lesson):
+        """Store a lesson written for prompts.anonymous(student), token and all"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO lessons (key, lesson, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, lesson, len(lesson.encode('utf-8')), now, now)
+        )
+        self.evict()
+
+    def evict(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM lessons WHERE created < ?", (time.time() - self.ttl,))
+        # Drop least recently used entries once the running total passes the cap
+        conn.execute("""
+            DELETE FROM lessons WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running FROM lessons
+                ) WHERE running > ?
+            )
+        """, (self.max_bytes,))
+
+    def stats(self):
+        entries, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM lessons").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': total,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,91 @@
+"""Map-reduce lessons for lecture packs too long for a single request.
+
+The extracted pages are split into sections, and each section's concepts
+are explained in parallel (map). A short final call then writes the title,
+overview, review and action plan around them (reduce). Wall-clock time
+follows the longest section instead of the whole document, and no single
+call has to fit every concept into its max_tokens.
+"""
+import base64
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import pdf_text
+from pdf_text import chunk_pages, vision_pdf
+from prompts import KEY_CONCEPTS, outline_request, section_request
+
+MAP_REDUCE_CHARS = 60000   # about 15k tokens of text; shorter PDFs get one request
+SECTION_CHARS = 20000
+MAP_WORKERS = 4
+
+
+def long_lesson_pages(pdf_bytes, digest, cache):
+    """Extracted pages if this PDF should be taught with map-reduce, else None"""
+    if not pdf_text.enabled():
+        return None
+    try:
+        pages = cache.pages(digest, pdf_bytes)
+    except Exception:
+        return None
+    return pages if sum(len(page['text']) for page in pages) > MAP_REDUCE_CHARS else None
+
+
+def sections(pages, pdf_bytes, max_chars=SECTION_CHARS):
+    """[(first_page, last_page, text, vision_pdf_base64 or None, vision_pages)]"""
+    result = []
+    for first, last, text in chunk_pages(pages, max_chars):
+        vision_pages = [p['page'] for p in pages if p['vision'] and first <= p['page'] <= last]
+        vision = vision_pdf(pdf_bytes, vision_pages)
+        result.append((first, last, text, base64.b64encode(vision).decode('utf-8') if vision else None, vision_pages))
+    return result
+
+
+def number_concepts(text):
+    """Number the concepts of every section as one sequence"""
+    counter = count(1)
+    return re.sub(r"^### Concept\b[^:\n]*:", lambda _: f"### Concept {next(counter)}:", text, flags=re.MULTILINE)
+
+
+def _fill(chunks, marker, replacement):
+    """Pass streamed text through, swapping marker for replacement even if it arrives split"""
+    chunks = iter(chunks)
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        if marker in pending:
+            before, after = pending.split(marker, 1)
+            yield before
+            yield replacement
+            yield after
+            yield from chunks
+            return
+        # Hold back just enough to catch a marker split across chunks
+        keep = len(marker) - 1
+        if len(pending) > keep:
+            yield pending[:-keep]
+            pending = pending[-keep:]
+    yield pending
+    # The model left the marker out: the concepts still belong in the lesson
+    yield f"\n\n## 📖 Key Concepts\n\n{replacement}\n"
+
+
+def stream_long_lesson(client, model, student, student_context, pages, pdf_bytes, usage=None, workers=MAP_WORKERS):
+    """Yield a lesson for a long PDF in the usual 📚 / 🎯 / 💡 / 📖 / ✅ / 🚀 structure"""
+    def explain(section):
+        first, last, text, vision_base64, vision_pages = section
+        message = client.messages.create(
+            **section_request(model, student, student_context, first, last, text, vision_base64, vision_pages)
+        )
+        if usage is not None:
+            usage.record(message.usage)
+        return message.content[0].text.strip()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lesson-map") as pool:
+        concepts = number_concepts("\n\n".join(pool.map(explain, sections(pages, pdf_bytes))))
+    titles = re.findall(r"^### Concept \d+: *(.+)$", concepts, flags=re.MULTILINE)
+
+    with client.messages.stream(**outline_request(model, student, student_context, titles)) as stream:
+        yield from _fill(stream.text_stream, KEY_CONCEPTS, concepts)
+        if usage is not None:
+            usage.record(stream.get_final_message().usage)
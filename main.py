@@ -1,7 +1,7 @@
 import streamlit as st
 import json
 import os
-from anthropic import Anthropic
+from ai_client import get_client
 from dotenv import load_dotenv
 import plotly.express as px
 import plotly.graph_objects as go
@@ -53,7 +53,7 @@ class PersonalAssistant:
         
         if not self.use_mock:
             try:
-                self.client = Anthropic(api_key=self.api_key)
+                self.client = get_client(self.api_key)
                 self.model = "claude-sonnet-4-20250514"
             except Exception as e:
                 st.warning(f"API error: {e}. Using mock mode.")
@@ -0,0 +1,160 @@
+"""Local text extraction for lecture PDFs.
+
+Sending a whole PDF as a document block costs a page image plus the text
+for every page. Most lecture pages are just text, so they are extracted
+here and sent as text. Only the pages that look like they need to be seen
+(little text, large images, or lots of vector drawing) go to the model as a
+smaller PDF.
+
+pypdf is optional: without it, or with LEARNWELL_PDF_MODE=document, the
+whole PDF is sent as before.
+"""
+import base64
+import io
+import json
+import logging
+import os
+import re
+
+from fileio import atomic_write
+
+try:
+    import pypdf
+    # pypdf warns about every font it can't fully decode; the text is still usable
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+except ImportError:
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the heuristics change so cached extractions are redone
+EXTRACTOR_VERSION = 1
+
+MIN_TEXT_CHARS = 200        # less text than this and the page is probably a picture or diagram
+MIN_IMAGE_PIXELS = 300 * 300  # smaller images are logos and icons
+MAX_DRAWING_OPS = 150       # more path operators than this is a chart or diagram
+CHUNK_CHARS = 12000
+
+# "x y l", "x y m", "x y w h re" and friends: path construction in a content stream
+_PATH_OPS = re.compile(rb"(?:-?[\d.]+\s+){2,6}(?:l|m|c|v|y|re)\s")
+
+
+def enabled():
+    return pypdf is not None and os.getenv('LEARNWELL_PDF_MODE', 'text').lower() == 'text'
+
+
+def _large_images(page):
+    resources = page.get('/Resources') or {}
+    xobjects = resources.get('/XObject') or {}
+    count = 0
+    for ref in xobjects.values():
+        obj = ref.get_object()
+        if obj.get('/Subtype') == '/Image' and (obj.get('/Width', 0) * obj.get('/Height', 0)) >= MIN_IMAGE_PIXELS:
+            count += 1
+    return count
+
+
+def _drawing_ops(page):
+    contents = page.get_contents()
+    if contents is None:
+        return 0
+    return len(_PATH_OPS.findall(contents.get_data()))
+
+
+def extract_pages(pdf_bytes):
+    """Text and a needs-vision verdict for every page"""
+    reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    pages = []
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        text = re.sub(r"[ \t]+", " ", text).strip()
+        images = _large_images(page)
+        drawing = _drawing_ops(page)
+        pages.append({
+            'page': number,
+            'text': text,
+            'vision': len(text) < MIN_TEXT_CHARS or images > 0 or drawing > MAX_DRAWING_OPS,
+        })
+    return pages
+
+
+def vision_pdf(pdf_bytes, page_numbers):
+    """A PDF holding only the given (1-based) pages, or None if there are none"""
+    if not page_numbers:
+        return None
+    reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    writer = pypdf.PdfWriter()
+    for number in page_numbers:
+        writer.add_page(reader.pages[number - 1])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def chunk_pages(pages, max_chars=CHUNK_CHARS):
+    """Group consecutive pages into sections of roughly max_chars of text.
+
+    Returns [(first_page, last_page, text)], with every page's text tagged
+    with its page number so the model can refer back to it.
+    """
+    chunks, current, size = [], [], 0
+    for page in pages:
+        tagged = f"[Page {page['page']}]\n{page['text']}" if page['text'] else f"[Page {page['page']}]"
+        if current and size + len(tagged) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((page['page'], tagged))
+        size += len(tagged)
+    if current:
+        chunks.append(current)
+    return [(chunk[0][0], chunk[-1][0], "\n\n".join(text for _, text in chunk)) for chunk in chunks]
+
+
+class PdfTextCache:
+    """Extractions on disk, keyed by the PDF's SHA-256, so each upload is parsed once"""
+
+    def __init__(self, root="pdf_text"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, f"{digest}.v{EXTRACTOR_VERSION}.json")
+
+    def pages(self, digest, pdf_bytes):
+        path = self._path(digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        pages = extract_pages(pdf_bytes)
+        atomic_write(path, json.dumps(pages, ensure_ascii=False).encode('utf-8'))
+        return pages
+
+
+def prepare(pdf_bytes, digest, cache):
+    """What to send for a PDF: (text, vision_pdf_bytes or None, pages)"""
+    pages = cache.pages(digest, pdf_bytes)
+    text = "\n\n".join(chunk for _, _, chunk in chunk_pages(pages))
+    return text, vision_pdf(pdf_bytes, [p['page'] for p in pages if p['vision']]), pages
+
+
+def document_parts(pdf_bytes, digest, cache):
+    """(pdf_base64, pdf_text, vision_pages) for a prompt.
+
+    Extracted text plus a PDF of the vision pages, whose original page
+    numbers are vision_pages; or else the whole PDF, with no text or pages.
+    """
+    if enabled():
+        try:
+            text, vision, pages = prepare(pdf_bytes, digest, cache)
+            # A scanned deck is all pictures; the original PDF is the cheapest way to send it
+            if not all(page['vision'] for page in pages):
+                vision_pages = [page['page'] for page in pages if page['vision']]
+                return (base64.b64encode(vision).decode('utf-8') if vision else None), text, vision_pages
+        except Exception as e:
+            logger.warning("PDF text extraction failed, sending the whole PDF: %s", e)
+    return base64.b64encode(pdf_bytes).decode('utf-8'), None, None
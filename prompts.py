@@ -0,0 +1,318 @@
+"""Prompt builders shared by the app and the command-line tools"""
+
+NAME_TOKEN = "{{student_name}}"
+
+
+def anonymous(student):
+    """The student with their name swapped for NAME_TOKEN.
+
+    Lessons are cached and shared between students, so the model writes them
+    without ever seeing the name; lesson_cache.personalize fills it in.
+    """
+    return dict(student, name=NAME_TOKEN)
+
+
+def build_student_context(student):
+    """Build comprehensive student context for AI"""
+    name = student['name']
+    if name == NAME_TOKEN:
+        name = f"{NAME_TOKEN} (write exactly this wherever you use their name)"
+    context = f"""
+## STUDENT PROFILE
+
+**Basic Info:**
+- Name: {name}
+- Age: {student['age']}
+- Subject: {student['subject']} (Year {student['year']})
+- Learning Style: {student.get('learning_style', 'Mixed')}
+- Best Study Time: {student.get('study_time', 'Flexible')}
+- Weekly Study Hours: {student.get('study_hours', 15)}
+
+**Current Wellbeing:**
+- Anxiety: {student.get('anxiety', 5)}/10
+- Stress: {student.get('stress', 5)}/10
+- Motivation: {student.get('motivation', 5)}/10
+- Sleep: {student.get('sleep_hours', 7)} hours ({student.get('sleep_quality', 'Fair')})
+"""
+
+    if student.get('challenge', {}).get('has_challenge'):
+        ch = student['challenge']
+        context += f"""
+**Learning Challenges:**
+- Types: {', '.join(ch.get('types', ['Not specified']))}
+- Impact: {ch.get('severity', 'Moderate')}
+- What Helps: {ch.get('what_helps', 'Not specified')}
+"""
+
+    context += f"""
+**Goals & Barriers:**
+- Main Goal: {student.get('goal', 'Academic success')}
+- Barriers: {', '.join(student.get('barriers', ['None specified']))}
+- Accessibility Needs: {', '.join(student.get('accessibility', ['None']))}
+"""
+    return context
+
+
+def vision_note(vision_pages):
+    """Says which lecture pages the attached vision PDF holds, since it numbers them from 1"""
+    pages = ", ".join(str(page) for page in vision_pages)
+    return (f"The attached PDF holds only the lecture pages with diagrams or images. Its pages are, "
+            f"in order, pages {pages} of the lecture; use those numbers, as the extracted text does.")
+
+
+def cached_prefix(pdf_base64, student_context, pdf_text=None, vision_pages=None):
+    """Document and student profile blocks, marked for prompt caching.
+
+    teach_pdf and generate_project_ideas start with the same blocks for the
+    same material, so later calls read them from the cache. With pdf_text
+    (see pdf_text.py) the lecture goes as text, and pdf_base64 holds only
+    the pages that need to be seen: vision_pages, by their original numbers.
+    """
+    blocks = lecture_blocks(pdf_base64, pdf_text, vision_pages, cache=True)
+    blocks.append({"type": "text", "text": student_context, "cache_control": {"type": "ephemeral"}})
+    return blocks
+
+
+def lecture_blocks(pdf_base64, pdf_text=None, vision_pages=None, cache=False):
+    """The lecture as a document block and/or extracted text, marked for caching only if cache"""
+    blocks = []
+    if pdf_base64:
+        blocks.append({
+            "type": "document",
+            "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_base64},
+        })
+        if cache:
+            blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        if vision_pages:
+            blocks.append({"type": "text", "text": vision_note(vision_pages)})
+    if pdf_text:
+        note = " Pages with diagrams or images are also attached as a PDF." if pdf_base64 else ""
+        blocks.append({
+            "type": "text",
+            "text": f"## LECTURE PDF (extracted text)\nThe text of the lecture PDF, page by page.{note}\n\n{pdf_text}",
+        })
+        if cache:
+            blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def _complexity(student):
+    # Adjust complexity based on student state
+    anxiety = student.get('anxiety', 5)
+    return "simple and reassuring" if anxiety >= 7 else "clear and engaging"
+
+
+def lesson_prompt(student):
+    """Prompt asking for a personalized lesson from the attached PDF and profile"""
+    complexity = _complexity(student)
+    
+    prompt = f"""You are a skilled, empathetic tutor. Read this PDF and create a personalized lesson for the student profiled above.
+
+## TEACHING APPROACH
+
+Based on this student's profile:
+- Use {complexity} language (Grade 8 reading level)
+- Keep paragraphs short (2-3 sentences max)
+- Include frequent encouragement
+- Match their learning style: {student.get('learning_style', 'Mixed')}
+- Consider their {student.get('study_hours', 15)} hours/week availability
+
+## LESSON STRUCTURE
+
+Create a complete lesson with:
+
+# 📚 [Topic Title]
+
+## 🎯 What You'll Learn
+A brief, encouraging overview (2-3 sentences)
+
+## 💡 Why This Matters
+Connect to their goal: "{student.get('goal', 'success')}"
+Make it relevant to {student['subject']}
+
+## 📖 Key Concepts
+
+### Concept 1: [Name]
+**The Simple Version:**
+Plain explanation in everyday language
+
+**Picture This:**
+A vivid analogy or mental image
+
+**Try It:**
+A quick practice question with answer
+
+### Concept 2: [Name]
+[Same structure...]
+
+[Continue for ALL major concepts in the PDF]
+
+## ✅ Quick Review
+- Key point 1
+- Key point 2  
+- Key point 3
+
+## 🚀 Your Action Plan
+Based on {student.get('study_hours', 15)} hours/week:
+- **Today (15 min):** [Specific task]
+- **This Week:** [Study plan]
+- **Remember:** [Encouraging note about their goal]
+
+---
+💙 You're making progress, {student['name']}! Take breaks when needed.
+"""
+    return prompt
+
+
+def lesson_request(model, student, pdf_base64, student_context=None, pdf_text=None, vision_pages=None):
+    """Messages API parameters for a teach_pdf lesson"""
+    if student_context is None:
+        student_context = build_student_context(student)
+    return {
+        "model": model,
+        "max_tokens": 4000,
+        "messages": [{
+            "role": "user",
+            "content": cached_prefix(pdf_base64, student_context, pdf_text, vision_pages) + [
+                {"type": "text", "text": lesson_prompt(student)}
+            ]
+        }]
+    }
+
+
+KEY_CONCEPTS = "{{KEY_CONCEPTS}}"
+
+
+def section_prompt(student):
+    """Map step of a long lesson: concept explanations for one section of the PDF.
+
+    The same for every section, so it is cached with the profile; the pages
+    follow it (see section_request).
+    """
+    return f"""You are a skilled, empathetic tutor. Below is one section of a longer lecture PDF. Explain every major concept in that section for the student profiled above.
+
+- Use {_complexity(student)} language (Grade 8 reading level)
+- Keep paragraphs short (2-3 sentences max)
+- Match their learning style: {student.get('learning_style', 'Mixed')}
+
+Write each concept in exactly this format:
+
+### Concept: [Name]
+**The Simple Version:**
+Plain explanation in everyday language
+
+**Picture This:**
+A vivid analogy or mental image
+
+**Try It:**
+A quick practice question with answer
+
+Output only the concept sections, with no introduction or summary. The rest of the lesson is written separately.
+"""
+
+
+def outline_prompt(student, concept_titles):
+    """Reduce step of a long lesson: everything around the key concepts"""
+    titles = "\n".join(f"{n}. {title}" for n, title in enumerate(concept_titles, start=1))
+    return f"""You are a skilled, empathetic tutor. A personalized lesson for the student profiled above has its key concepts written already, in this order:
+
+{titles}
+
+Write the rest of the lesson in {_complexity(student)} language (Grade 8 reading level), with short paragraphs. Use exactly this structure, and put the line {KEY_CONCEPTS} on its own where the concepts go:
+
+# 📚 [Topic Title]
+
+## 🎯 What You'll Learn
+A brief, encouraging overview (2-3 sentences)
+
+## 💡 Why This Matters
+Connect to their goal: "{student.get('goal', 'success')}"
+Make it relevant to {student['subject']}
+
+## 📖 Key Concepts
+
+{KEY_CONCEPTS}
+
+## ✅ Quick Review
+- 3-5 key points covering the concepts above
+
+## 🚀 Your Action Plan
+Based on {student.get('study_hours', 15)} hours/week:
+- **Today (15 min):** [Specific task]
+- **This Week:** [Study plan]
+- **Remember:** [Encouraging note about their goal]
+
+---
+💙 You're making progress, {student['name']}! Take breaks when needed.
+"""
+
+
+def section_request(model, student, student_context, first_page, last_page, section_text, pdf_base64=None,
+                    vision_pages=None):
+    """Messages API parameters for one map step of a long lesson.
+
+    Only the profile and instructions, shared by every section, are marked
+    for caching; each section's pages are read once and follow them uncached.
+    """
+    return {
+        "model": model,
+        "max_tokens": 3000,
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": student_context},
+                {"type": "text", "text": section_prompt(student), "cache_control": {"type": "ephemeral"}},
+                *lecture_blocks(pdf_base64, section_text, vision_pages),
+                {"type": "text", "text": f"This section is pages {first_page}-{last_page}. Explain its concepts now."}
+            ]
+        }]
+    }
+
+
+def outline_request(model, student, student_context, concept_titles):
+    """Messages API parameters for the reduce step of a long lesson"""
+    return {
+        "model": model,
+        "max_tokens": 1500,
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": student_context},
+                {"type": "text", "text": outline_prompt(student, concept_titles)}
+            ]
+        }]
+    }
+
+
+def notes_prompt(student, days, rhythm, overview=False):
+    """Words for a scheduled study plan; days maps each day to reword to its sessions"""
+    schedule = "\n".join(
+        f"- {day}: " + ("; ".join(f"{s['slot']}-{s['end']} {s['material']} ({s['minutes']} min)" for s in sessions)
+                        or "rest day")
+        for day, sessions in days.items()
+    )
+    focus, rest = rhythm
+    ask = "a short overview of the week (2-3 encouraging sentences) and " if overview else ""
+    shape = '{"overview": "...", "notes": {"Monday": "..."}}' if overview else '{"notes": {"Monday": "..."}}'
+    return f"""The weekly study plan of the student profiled above is already scheduled. Sessions use {focus}-minute focus blocks with {rest}-minute breaks.
+
+{schedule}
+
+Write {ask}one or two supportive sentences of guidance for each of these days. Consider their anxiety level ({student.get('anxiety', 5)}/10), their {student.get('sleep_hours', 7)} hours of sleep, breaks and self-care. Don't change the schedule.
+
+Reply with JSON only, in this shape: {shape}"""
+
+
+def notes_request(model, student, student_context, days, rhythm, overview=False):
+    """Messages API parameters for the wording of a study plan, or of the days that changed"""
+    return {
+        "model": model,
+        "max_tokens": 150 * len(days) + (300 if overview else 100),
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": student_context, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": notes_prompt(student, days, rhythm, overview)}
+            ]
+        }]
+    }
@@ -0,0 +1,155 @@
+"""Deterministic weekly scheduling of study sessions.
+
+Pending materials are packed into the student's week under a few rules:
+    - study minutes stay within study_hours per week, spread over Monday to
+      Saturday; Sunday is only used when the other days are full
+    - sessions start around the preferred study_time and end an hour before
+      bedtime, worked out from sleep_hours and a 07:00 wake-up
+    - effort comes from the lesson length (see estimate_minutes)
+    - students with anxiety >= 7 work in 25-minute Pomodoro blocks with
+      5-minute breaks; everyone else in 50/10 blocks
+
+The same input always gives the same schedule, and there's no model call:
+a student's week takes well under a millisecond.
+"""
+import math
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+REST_DAY = "Sunday"
+
+START_TIMES = {
+    "🌅 Early Morning": "07:30",
+    "☀️ Mid Morning": "10:00",
+    "🌤️ Afternoon": "14:00",
+    "🌆 Evening": "18:00",
+    "🌙 Night": "21:00",
+}
+DEFAULT_START = "18:00"
+
+WAKE = 7 * 60
+EARLIEST = WAKE + 30
+LATEST = 24 * 60            # nobody is scheduled past midnight, however little they sleep
+WIND_DOWN = 60
+
+POMODORO = (25, 5)          # focus minutes, break minutes
+STANDARD = (50, 10)
+ANXIETY_POMODORO = 7
+SESSION_GAP = 15
+
+CHARS_PER_MINUTE = 1000     # the reading estimate shown on the materials tab
+STUDY_FACTOR = 2            # reading plus notes and review
+MIN_SESSION = 20
+MAX_SESSION = 90
+
+
+def estimate_minutes(material):
+    """Study time for one material, in 5-minute steps"""
+    # Lessons still held inline haven't been measured yet
+    chars = material.get('lesson_chars') or len(material.get('lesson') or "")
+    reading = chars / CHARS_PER_MINUTE
+    minutes = 5 * math.ceil(reading * STUDY_FACTOR / 5)
+    return min(MAX_SESSION, max(MIN_SESSION, minutes))
+
+
+def rhythm(student):
+    """(focus, break) minutes for the student's sessions"""
+    return POMODORO if student.get('anxiety', 5) >= ANXIETY_POMODORO else STANDARD
+
+
+def to_minutes(slot):
+    hours, minutes = slot.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def to_slot(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class Week:
+    """One student's week as it fills up with sessions"""
+
+    def __init__(self, student):
+        self.focus, self.rest = rhythm(student)
+        self.budget = student.get('study_hours', 15) * 60
+        self.daily = self.budget // (len(DAYS) - 1)
+        self.stop = min(LATEST, WAKE + 24 * 60 - student.get('sleep_hours', 7) * 60 - WIND_DOWN)
+        self.preferred = to_minutes(START_TIMES.get(student.get('study_time'), DEFAULT_START))
+        self.used = {day: 0 for day in DAYS}
+        self.clock = {day: 0 for day in DAYS}   # minutes on the clock, breaks and gaps included
+        self.total = 0
+        self.sessions = []
+        self.later = []
+
+    def wall(self, minutes):
+        """Minutes on the clock for a session, breaks included"""
+        return minutes + (max(minutes, 1) - 1) // self.focus * self.rest
+
+    def start(self, day):
+        """A day starts at the preferred time, or early enough to finish before bedtime"""
+        return max(EARLIEST, min(self.preferred, self.stop - self.clock[day]))
+
+    def fits(self, day, minutes):
+        # One session may go over the daily share on an empty day; the weekly budget is firm
+        daily = self.daily if self.used[day] else max(self.daily, minutes)
+        gap = SESSION_GAP if self.used[day] else 0
+        return (self.total + minutes <= self.budget and self.used[day] + minutes <= daily
+                and EARLIEST + self.clock[day] + gap + self.wall(minutes) <= self.stop)
+
+    def add(self, day, material, minutes):
+        """Add a session to a day; its times are set by ordered_sessions"""
+        session = {
+            'day': day,
+            'slot': "",
+            'end': "",
+            'material_id': material['id'],
+            'material': material['name'],
+            'minutes': minutes,
+            'breaks': (max(minutes, 1) - 1) // self.focus,
+        }
+        self.clock[day] += (SESSION_GAP if self.used[day] else 0) + self.wall(minutes)
+        self.used[day] += minutes
+        self.total += minutes
+        self.sessions.append(session)
+        return session
+
+    def place(self, material, minutes=None):
+        """Put a material on the lightest day it fits; None if the week is full"""
+        if minutes is None:
+            minutes = estimate_minutes(material)
+        for days in ([d for d in DAYS if d != REST_DAY], [REST_DAY]):
+            fitting = [day for day in days if self.fits(day, minutes)]
+            if fitting:
+                return self.add(min(fitting, key=self.used.__getitem__), material, minutes)
+        self.later.append({'material_id': material['id'], 'material': material['name'], 'minutes': minutes})
+        return None
+
+    def ordered_sessions(self):
+        """Sessions by day, laid out back to back from each day's start"""
+        clocks = {day: self.start(day) for day in DAYS}
+        for session in self.sessions:
+            start = clocks[session['day']]
+            session['slot'] = to_slot(start)
+            session['end'] = to_slot(start + self.wall(session['minutes']))
+            clocks[session['day']] = start + self.wall(session['minutes']) + SESSION_GAP
+        return sorted(self.sessions, key=lambda s: DAYS.index(s['day']))
+
+
+def schedule(student, materials, keep=()):
+    """Schedule the student's pending materials; returns (sessions, later).
+
+    keep holds sessions from an earlier schedule: their materials stay on the
+    same day (laid out again from the start time), and only the rest are placed.
+    """
+    pending = {m['id']: m for m in materials if not m.get('done') and m.get('id')}
+    week = Week(student)
+    placed = set()
+    for session in sorted(keep, key=lambda s: (DAYS.index(s['day']), s['slot'])):
+        material = pending.get(session['material_id'])
+        if material is not None and session['material_id'] not in placed:
+            week.add(session['day'], material, session['minutes'])
+            placed.add(session['material_id'])
+    for material_id, material in pending.items():
+        if material_id not in placed:
+            week.place(material)
+    return week.ordered_sessions(), week.later
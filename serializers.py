@@ -0,0 +1,85 @@
+"""Serializers for the user store's data column.
+
+The format is picked with LEARNWELL_USER_FORMAT:
+    orjson   compact JSON through orjson (default when it is installed)
+    json     compact JSON through the standard library
+    msgpack  MessagePack, stored as a BLOB
+
+JSON formats are stored as TEXT and msgpack as BLOB, so rows written in
+any format can always be read back, and the format can be switched on an
+existing database.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonSerializer:
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, obj):
+        return self._msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data):
+        return self._msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    'orjson': OrjsonSerializer,
+    'json': JsonSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def get_serializer(name=None):
+    """Build the configured serializer"""
+    name = (name or os.getenv('LEARNWELL_USER_FORMAT', 'orjson' if orjson else 'json')).lower()
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown user format '{name}'. Choose from: {', '.join(SERIALIZERS)}")
+    return SERIALIZERS[name]()
+
+
+_json_loads = orjson.loads if orjson else json.loads
+_msgpack = None
+
+
+def decode(data):
+    """Read a stored record whatever format it was written in"""
+    global _msgpack
+    if isinstance(data, bytes):
+        if _msgpack is None:
+            _msgpack = MsgpackSerializer()
+        return _msgpack.loads(data)
+    return _json_loads(data)
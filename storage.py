@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from blobstore import BlobStore, externalize_lesson, externalize_pdf
+from fileio import atomic_write, file_lock
+from jsonstream import iter_records
+from serializers import decode, get_serializer
+
+
+def open_db(db_file, check_same_thread=True):
+    """Open a SQLite connection in autocommit mode, tuned for several Streamlit sessions"""
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ThreadConnections:
+    """Calling it returns this thread's connection to db_file, opened on first use.
+
+    Streamlit runs each session in its own thread, and a sqlite3 connection
+    belongs to the thread that opened it.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = open_db(self.db_file)
+        return conn
+
+
+def _copy(value):
+    """Copy the dicts and lists of a JSON record; strings and numbers are shared"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def normalize_name(name):
+    """Normalize a name the way login compares it"""
+    return name.lower().strip()
+
+
+def new_material_id():
+    return uuid.uuid4().hex[:12]
+
+
+def externalize_materials(user, blobs):
+    """Keep user records small: PDFs and lesson bodies go to the blob store.
+
+    Every material also gets a stable id, so the UI can refer to it across
+    reruns and filters instead of by list position.
+    """
+    for material in user.get('materials', []):
+        material.setdefault('id', new_material_id())
+        externalize_pdf(material, blobs)
+        externalize_lesson(material, blobs)
+
+
+class LoginIndex:
+    """In-memory map of student_id -> (normalized name, rowid) for logins.
+
+    Built once from the small columns only, updated by every put, and caught
+    up with writes from other connections or processes by reading rows whose
+    version is newer than any refresh() has read. Local puts don't move that
+    mark: another process may have committed a lower version in between.
+    PRAGMA data_version tells us when there is anything to read at all.
+    """
+
+    def __init__(self, db_file):
+        self._conn = open_db(db_file, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = -1
+        self._data_version = None
+        self.refresh()
+
+    def refresh(self):
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            rows = self._conn.execute(
+                "SELECT student_id, name_key, rowid, version FROM users WHERE version > ?", (self._version,)
+            ).fetchall()
+            # Versions are handed out in commit order, so everything up to here has been seen
+            if rows:
+                self._version = max(row[3] for row in rows)
+        for row in rows:
+            self.update(*row)
+
+    def update(self, student_id, name_key, rowid, version):
+        with self._lock:
+            current = self._entries.get(student_id)
+            if current is None or current[2] <= version:
+                self._entries[student_id] = (name_key, rowid, version)
+
+    def lookup(self, student_id):
+        """(name_key, rowid, version) for a student, or None"""
+        self.refresh()
+        return self._entries.get(student_id)
+
+    def student_ids(self):
+        self.refresh()
+        return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserCache:
+    """Parsed user records shared by every session in the process.
+
+    Entries are tagged with the row version they were read at, so a newer
+    version in the login index makes them stale without touching the
+    database. Records are copied on the way in and out; sessions mutate
+    their own copy and never each other's.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id, version):
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(student_id)
+            self.hits += 1
+            record = entry[1]
+        return _copy(record)
+
+    def put(self, student_id, version, record):
+        record = _copy(record)
+        with self._lock:
+            current = self._entries.get(student_id)
+            if current is not None and current[0] > version:
+                return
+            self._entries[student_id] = (version, record)
+            self._entries.move_to_end(student_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class GroupCommitter:
+    """Folds put() calls that arrive within a short window into one transaction.
+
+    Each caller still blocks until its own record is committed, so nothing
+    changes for them except that a burst of saves costs one commit.
+    """
+
+    def __init__(self, store, window_ms):
+        self.store = store
+        self.window = window_ms / 1000.0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="user-group-commit", daemon=True).start()
+
+    def submit(self, user_data):
+        done = threading.Event()
+        outcome = {}
+        self._queue.put((user_data, done, outcome))
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.store.put_many([user_data for user_data, _, _ in batch])
+            except Exception as e:
+                for _, _, outcome in batch:
+                    outcome['error'] = e
+            for _, done, _ in batch:
+                done.set()
+
+
+class UserStore:
+    """SQLite user store with one row per student, keyed by student_id.
+
+    SQLite commits are atomic and WAL mode lets several Streamlit processes
+    read and write the same users.db; concurrent writers wait on the busy
+    timeout instead of interleaving. group_commit_ms > 0 batches save_user
+    calls from concurrent sessions into shared transactions. Records are
+    written with serializer (see serializers.py) and read in any format.
+    write_only stores skip the login index and record cache, for bulk
+    loaders that never read back what they write.
+    """
+
+    def __init__(self, db_file="users.db", group_commit_ms=0, serializer=None, write_only=False):
+        self.db_file = db_file
+        self.serializer = serializer or get_serializer()
+        self._conn = ThreadConnections(db_file)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                student_id TEXT PRIMARY KEY,
+                name_key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+        if 'version' not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS users_version ON users (version)")
+        self.write_only = write_only
+        self.index = None if write_only else LoginIndex(db_file)
+        self.cache = None if write_only else UserCache()
+        self._group = GroupCommitter(self, group_commit_ms) if group_commit_ms > 0 else None
+
+    def _remember(self, student_id, name_key, rowid, version, user_data):
+        if not self.write_only:
+            self.index.update(student_id, name_key, rowid, version)
+            self.cache.put(student_id, version, user_data)
+
+    def _read(self, student_id, entry, name_key=None):
+        """Read through the shared cache; entry is the login index entry.
+
+        With name_key, a row whose name no longer matches is treated as missing.
+        """
+        _, rowid, version = entry
+        user = self.cache.get(student_id, version)
+        if user is not None:
+            return user
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT student_id, name_key, data, version FROM users WHERE rowid = ?", (rowid,)
+        ).fetchone()
+        if row is None or row[0] != student_id:
+            # Rewritten since the index last looked, and the rowid may now be someone else's
+            row = conn.execute(
+                "SELECT student_id, name_key, data, version FROM users WHERE student_id = ?", (student_id,)
+            ).fetchone()
+        if row is None or (name_key is not None and row[1] != name_key):
+            return None
+        user = decode(row[2])
+        self.cache.put(student_id, row[3], user)
+        return user
+
+    def get(self, student_id):
+        entry = self.index.lookup(student_id)
+        return self._read(student_id, entry) if entry else None
+
+    def find(self, student_id, name):
+        """Return the user only if the normalized name matches"""
+        name_key = normalize_name(name)
+        entry = self.index.lookup(student_id)
+        # Wrong IDs and names are turned away without reading the record
+        if entry is None or entry[0] != name_key:
+            return None
+        return self._read(student_id, entry, name_key)
+
+    def _write(self, conn, user_data):
+        name_key = normalize_name(user_data['name'])
+        rowid, version = conn.execute(
+            "INSERT OR REPLACE INTO users (student_id, name_key, data, version) "
+            "VALUES (?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM users)) RETURNING rowid, version",
+            (user_data['student_id'], name_key, self.serializer.dumps(user_data))
+        ).fetchone()
+        return user_data['student_id'], name_key, rowid, version
+
+    def put(self, user_data):
+        if self._group is not None:
+            self._group.submit(user_data)
+            return
+        self._remember(*self._write(self._conn(), user_data), user_data)
+
+    def put_many(self, users):
+        """Write several users in a single transaction"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            users = list(users)
+            written = [self._write(conn, u) for u in users]
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        for user_data, entry in zip(users, written):
+            self._remember(*entry, user_data)
+
+    def all(self):
+        users = {}
+        for student_id, version, data in self._conn().execute("SELECT student_id, version, data FROM users"):
+            # Reuse parsed records that are still current, but don't flood the cache with a full scan
+            user = None if self.write_only else self.cache.get(student_id, version)
+            users[student_id] = user if user is not None else decode(data)
+        return users
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def migrate_json(json_file, store, blobs=None, batch_size=1000):
+    """Import users_database.json (or an NDJSON file of users) into the store.
+
+    Users are streamed from the file and written in batches, so memory use
+    doesn't grow with the size of the file.
+    """
+    count = 0
+    batch = []
+    with file_lock(json_file, shared=True):
+        for user in iter_records(json_file, key_field='student_id'):
+            if blobs is not None:
+                externalize_materials(user, blobs)
+            batch.append(user)
+            if len(batch) >= batch_size:
+                store.put_many(batch)
+                count += len(batch)
+                batch = []
+    if batch:
+        store.put_many(batch)
+        count += len(batch)
+    return count
+
+
+def export_json(store, json_file):
+    """Write every user to an indented JSON file, crash-safely and under the file lock"""
+    users = store.all()
+    with file_lock(json_file):
+        atomic_write(json_file, json.dumps(users, indent=2).encode('utf-8'))
+    return len(users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users between users_database.json and the SQLite store")
+    parser.add_argument("json_file", nargs="?", default="users_database.json")
+    parser.add_argument("db_file", nargs="?", default="users.db")
+    parser.add_argument("--export", action="store_true", help="Write the store out to json_file instead")
+    args = parser.parse_args()
+    if args.export:
+        count = export_json(UserStore(args.db_file), args.json_file)
+        print(f"Exported {count} users from {args.db_file} to {args.json_file}")
+    elif not os.path.exists(args.json_file):
+        parser.exit(1, f"Nothing to migrate: {args.json_file} not found\n")
+    else:
+        count = migrate_json(args.json_file, UserStore(args.db_file), BlobStore("blobs"))
+        print(f"Migrated {count} users from {args.json_file} to {args.db_file}")
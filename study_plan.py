@@ -0,0 +1,168 @@
+"""Weekly study plans kept as data on the user record.
+
+A plan looks like:
+    {'created': iso, 'updated': iso, 'overview': str, 'rhythm': [focus, break],
+     'sessions': [{'day', 'slot', 'end', 'material_id', 'material', 'minutes', 'breaks'}],
+     'later': [{'material_id', 'material', 'minutes'}],
+     'notes': {day: str}}
+
+Sessions come from the local scheduler (see scheduler.py), so a plan is
+ready as soon as it's asked for. The model only words the overview and the
+day notes. Finishing or adding a material reschedules locally, and only the
+days that changed need their notes rewritten.
+
+Usage:
+    python study_plan.py --db users.db             # schedule every stored student
+    python study_plan.py --db users.db --save      # ...and save the plans
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from scheduler import DAYS, Week, rhythm, schedule, to_slot
+from storage import UserStore
+
+SAVE_BATCH = 1000
+
+
+def sessions_by_day(plan):
+    days = {day: [] for day in DAYS}
+    for session in plan['sessions']:
+        days[session['day']].append(session)
+    return days
+
+
+def _day_keys(plan):
+    return {day: [(s['slot'], s['material_id'], s['minutes']) for s in sessions]
+            for day, sessions in sessions_by_day(plan).items()}
+
+
+def empty_plan():
+    now = datetime.now().isoformat()
+    return {'created': now, 'updated': now, 'overview': "", 'rhythm': None,
+            'sessions': [], 'later': [], 'notes': {}}
+
+
+def update_plan(plan, student, materials):
+    """Bring a plan in line with the student's materials without asking the model.
+
+    Sessions for finished or deleted materials are dropped, the rest keep
+    their day, and new pending materials are scheduled around them. Returns
+    (plan, days), days being the ones whose sessions changed.
+    """
+    sessions, later = schedule(student, materials, keep=plan['sessions'])
+    updated = dict(plan, sessions=sessions, later=later, rhythm=list(rhythm(student)),
+                   updated=datetime.now().isoformat())
+    before, after = _day_keys(plan), _day_keys(updated)
+    return updated, [day for day in DAYS if before[day] != after[day]]
+
+
+def local_note(student, sessions):
+    """A short note for a day, until the model has worded one"""
+    if not sessions:
+        return "Rest day. A walk and an early night help the week's work settle in. 😴"
+    minutes = sum(s['minutes'] for s in sessions)
+    focus, rest = rhythm(student)
+    return (f"{len(sessions)} session{'s' if len(sessions) > 1 else ''}, {minutes} min in total. "
+            f"Stop for {rest} minutes every {focus} minutes: stretch and refill your water. 💧")
+
+
+def local_notes(student, plan, days=DAYS):
+    by_day = sessions_by_day(plan)
+    return {day: local_note(student, by_day[day]) for day in days}
+
+
+def local_overview(student, plan):
+    minutes = sum(s['minutes'] for s in plan['sessions'])
+    overview = (f"{minutes // 60}h {minutes % 60:02d}m of study this week, within your "
+                f"{student.get('study_hours', 15)} hours. Sessions finish by {to_slot(Week(student).stop)}, "
+                f"leaving time to wind down before bed.")
+    if student.get('sleep_hours', 7) < 6:
+        overview += " Try to get more rest. Sleep helps learning! 😴"
+    return f"{overview} Keep your goal in mind: {student.get('goal', 'Success!')}"
+
+
+def local_plan(student, materials):
+    """A complete plan with locally written notes"""
+    plan, _ = update_plan(empty_plan(), student, materials)
+    plan['overview'] = local_overview(student, plan)
+    plan['notes'] = local_notes(student, plan)
+    return plan
+
+
+def json_object(text):
+    """The JSON object in a model reply, tolerating code fences and chatter around it"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("No JSON object in the reply")
+    return json.loads(text[start:end + 1])
+
+
+def parse_notes(text, days):
+    """{'notes': {day: note}} and, if the model wrote one, 'overview'"""
+    data = json_object(text)
+    notes = data.get('notes') if isinstance(data.get('notes'), dict) else data
+    result = {'notes': {day: str(notes[day]) for day in days if notes.get(day)}}
+    if isinstance(data.get('overview'), str) and data['overview']:
+        result['overview'] = data['overview']
+    return result
+
+
+def plan_markdown(plan):
+    """The plan as the markdown shown, read aloud and downloaded"""
+    lines = ["# 📅 Your Weekly Study Plan", ""]
+    if plan.get('overview'):
+        lines += [plan['overview'], ""]
+    if plan.get('rhythm'):
+        focus, rest = plan['rhythm']
+        lines += [f"Sessions run in {focus}-minute focus blocks with {rest}-minute breaks.", ""]
+    for day, sessions in sessions_by_day(plan).items():
+        lines.append(f"## {day}")
+        for s in sessions:
+            end = f"–{s['end']}" if s.get('end') else ""
+            lines.append(f"- **{s['slot']}{end}** · {s['minutes']} min · {s['material']}")
+        if not sessions:
+            lines.append("- Rest day")
+        if plan['notes'].get(day):
+            lines += ["", f"_{plan['notes'][day]}_"]
+        lines.append("")
+    if plan.get('later'):
+        lines.append("## ⏭️ Next Week")
+        lines += [f"- {item['material']} · {item['minutes']} min" for item in plan['later']]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def plan_cohort(users):
+    """Yield (student_id, plan) for many students.
+
+    Scheduling is cheap enough that one process keeps up; handing users to
+    worker processes costs more in pickling than it saves.
+    """
+    for user in users:
+        yield user['student_id'], local_plan(user, user.get('materials', []))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Schedule study plans for every stored student")
+    parser.add_argument("--db", default="users.db", help="SQLite user store")
+    parser.add_argument("--save", action="store_true", help="Save each plan on its user record")
+    args = parser.parse_args()
+
+    store = UserStore(args.db)
+    users = list(store.all().values())
+    start = time.perf_counter()
+    plans = dict(plan_cohort(users))
+    seconds = time.perf_counter() - start
+    sessions = sum(len(plan['sessions']) for plan in plans.values())
+    later = sum(1 for plan in plans.values() if plan['later'])
+    print(f"Scheduled {len(plans)} students ({sessions} sessions) in {seconds:.2f}s, "
+          f"{len(plans) / max(seconds, 1e-9):,.0f} students/s; {later} have work left for next week")
+
+    if args.save:
+        for user in users:
+            user['study_plan'] = plans[user['student_id']]
+        for i in range(0, len(users), SAVE_BATCH):
+            store.put_many(users[i:i + SAVE_BATCH])
+        print(f"Saved {len(users)} plans to {args.db}")
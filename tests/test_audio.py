@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+import time
+
+from audio import AudioCache, join_mp3, split_sentences, strip_markdown
+
+ID3_HEADER = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10   # 10-byte header, 10-byte tag
+ID3V1_TAG = b"TAG" + b"\x00" * 125
+
+
+class StubEngine:
+    """Returns the text as bytes after a random delay, so chunks finish out of order"""
+    name = "stub"
+    format = "mp3"
+
+    def __init__(self):
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def synthesize(self, text, lang='en', tld='co.uk'):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+        time.sleep(random.uniform(0, 0.02))
+        return text.encode('utf-8')
+
+
+def test_split_keeps_abbreviations_with_their_sentence():
+    text = "See Fig. 2 for the curve, e.g. the peak. Dr. Smith and J. Doe agree. Next."
+    chunks = split_sentences(text, max_chars=40)
+    assert chunks == ["See Fig. 2 for the curve, e.g. the peak.", "Dr. Smith and J. Doe agree. Next."]
+
+
+def test_split_packs_whole_sentences():
+    text = "One two. Three four! Five six? Seven."
+    assert split_sentences(text, max_chars=20) == ["One two. Three four!", "Five six? Seven."]
+    assert " ".join(split_sentences(text, max_chars=20)) == text
+
+
+def test_split_text_without_punctuation():
+    text = " ".join(f"word{n}" for n in range(50))
+    chunks = split_sentences(text, max_chars=60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_cuts_overlong_sentence_at_words():
+    long_sentence = " ".join(["lengthy"] * 30) + "."
+    chunks = split_sentences(f"Short one. {long_sentence} After.", max_chars=50)
+    assert chunks[0] == "Short one."
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert not any(chunk.startswith(" ") or chunk.endswith(" ") for chunk in chunks)
+    assert " ".join(chunks) == f"Short one. {long_sentence} After."
+
+
+def test_split_cuts_a_single_unbroken_word():
+    assert split_sentences("x" * 25, max_chars=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_join_mp3_strips_tags_between_frames():
+    frames = [b"\xff\xfb" + bytes([n]) * 40 for n in range(3)]
+    parts = [ID3_HEADER + frames[0] + ID3V1_TAG, ID3_HEADER + frames[1], frames[2] + ID3V1_TAG]
+    assert join_mp3(parts) == b"".join(frames)
+
+
+def test_join_mp3_leaves_untagged_audio_alone():
+    frames = [b"\xff\xfb" + b"a" * 200, b"\xff\xfb" + b"b" * 10]
+    assert join_mp3(frames) == b"".join(frames)
+
+
+def test_iter_long_keeps_order_with_four_threads(tmp_path):
+    engine = StubEngine()
+    cache = AudioCache(str(tmp_path / "audio"), engine=engine)
+    text = "\n".join(f"## Part {n}\nSentence number {n} of the lesson, read aloud in order." for n in range(40))
+    expected = split_sentences(strip_markdown(text))
+    assert len(expected) > 4
+
+    parts = list(cache.iter_long(text, workers=4))
+
+    assert [part.decode('utf-8') for part in parts] == expected
+    assert len(engine.threads) > 1
+    assert cache.join(parts) == b"".join(parts)
+    # Every chunk is cached on its own
+    assert list(cache.iter_long(text, workers=4)) == parts
+    assert cache.misses == len(expected)
+
+
+def test_disk_cache_lists_the_directory_only_when_over_budget(tmp_path, monkeypatch):
+    cache = AudioCache(str(tmp_path / "audio"), max_memory_bytes=1, max_disk_bytes=100, engine=StubEngine())
+    listings = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listings.append(path) or real_listdir(path))
+
+    for n in range(5):
+        cache.get(f"chunk {n:02d} " + "x" * 10)   # 19 bytes each
+    assert listings == []
+    assert cache.disk_bytes == 95
+
+    cache.get("chunk 05 " + "x" * 10)
+    assert len(listings) == 1
+    assert cache.disk_bytes <= 100
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    disk = tmp_path / "audio"
+    cache = AudioCache(str(disk), max_memory_bytes=1, max_disk_bytes=60, engine=StubEngine())
+    texts = [f"chunk {n:02d} " + "x" * 10 for n in range(3)]
+    for n, text in enumerate(texts):
+        cache.get(text)
+        for path in disk.iterdir():
+            # Older files look older, whatever the filesystem's timestamp resolution
+            os.utime(path, (path.stat().st_mtime - 10, path.stat().st_mtime - 10))
+
+    # A disk hit on the oldest file makes it the most recently used
+    cache.memory.clear()
+    cache.get(texts[0])
+    cache.get("chunk 03 " + "x" * 10)
+
+    misses = cache.misses
+    cache.memory.clear()
+    cache.get(texts[0])
+    assert cache.misses == misses
+    cache.get(texts[1])
+    assert cache.misses == misses + 1
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+
+from batch_lessons import LocalBatches, build_requests, load_state, run, save_state
+from blobstore import BlobStore
+from lesson_cache import LessonCache
+from storage import UserStore
+
+STUDENTS = ["STU20250001", "STU20250002"]
+
+
+class FailingBatches(LocalBatches):
+    """LocalBatches whose results come back errored for some custom_ids"""
+
+    def __init__(self, root, fail):
+        super().__init__(root)
+        self.fail = fail
+
+    def results(self, batch_id):
+        for entry in super().results(batch_id):
+            if entry.custom_id in self.fail:
+                entry.result = SimpleNamespace(type="errored")
+            yield entry
+
+
+class CrashingBatches(LocalBatches):
+    def create(self, requests):
+        raise KeyboardInterrupt
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    # Not a real PDF: text extraction fails and the bytes are sent whole
+    (pdf_dir / "week1.pdf").write_bytes(b"%PDF-1.4 week one")
+    (pdf_dir / "week2.pdf").write_bytes(b"%PDF-1.4 week two")
+    store = UserStore(str(tmp_path / "users.db"))
+    for student_id, name in zip(STUDENTS, ["Will", "Grace"]):
+        store.put({'student_id': student_id, 'name': name, 'age': 20, 'subject': "Biology",
+                   'year': 1, 'materials': []})
+    return SimpleNamespace(
+        pdf_dir=str(pdf_dir), store=store, blobs=BlobStore(str(tmp_path / "blobs")),
+        cache=LessonCache(str(tmp_path / "lesson_cache.db")), state=str(tmp_path / "state.json"),
+        batches_root=str(tmp_path / "batches"),
+    )
+
+
+def _run(env, batches, student_ids=STUDENTS):
+    run(env.pdf_dir, student_ids, batches, env.store, env.blobs, env.cache, env.state, poll_seconds=0)
+
+
+def _lessons(env, student_id):
+    return sorted(m['name'] for m in env.store.get(student_id)['materials'])
+
+
+def test_submit_saves_every_lesson_and_clears_state(env):
+    _run(env, LocalBatches(env.batches_root))
+
+    for student_id in STUDENTS:
+        assert _lessons(env, student_id) == ["week1.pdf", "week2.pdf"]
+    material = env.store.get(STUDENTS[0])['materials'][0]
+    assert env.blobs.read(material['lesson_sha256']).decode('utf-8').startswith("# 📚 Lesson for Will")
+    assert load_state(env.state) is None
+
+
+def test_rerun_submits_nothing_new(env, capsys):
+    _run(env, LocalBatches(env.batches_root))
+    _run(env, LocalBatches(env.batches_root))
+
+    assert _lessons(env, STUDENTS[0]) == ["week1.pdf", "week2.pdf"]
+    assert "Every student already has a lesson" in capsys.readouterr().out
+
+
+def test_crash_in_create_leaves_nothing_to_resume(env):
+    with pytest.raises(KeyboardInterrupt):
+        _run(env, CrashingBatches(env.batches_root))
+    assert load_state(env.state) is None
+
+    _run(env, LocalBatches(env.batches_root))
+    assert _lessons(env, STUDENTS[1]) == ["week1.pdf", "week2.pdf"]
+
+
+def test_resume_state_without_batch_id_resubmits(env):
+    # A state file from before create() returned
+    _, meta = build_requests(env.pdf_dir, STUDENTS, env.store, env.blobs, "model")
+    save_state({'batch_id': None, 'requests': meta, 'applied': []}, env.state)
+
+    _run(env, LocalBatches(env.batches_root), student_ids=[])
+
+    for student_id in STUDENTS:
+        assert _lessons(env, student_id) == ["week1.pdf", "week2.pdf"]
+    assert load_state(env.state) is None
+
+
+def test_resume_applies_each_lesson_once(env):
+    batches = LocalBatches(env.batches_root)
+    requests, meta = build_requests(env.pdf_dir, STUDENTS, env.store, env.blobs, "model")
+    batch = batches.create(requests=requests)
+    first = requests[0]['custom_id']
+    save_state({'batch_id': batch.id, 'requests': meta, 'applied': [first]}, env.state)
+
+    _run(env, batches, student_ids=[])
+
+    # The entry marked applied before the crash isn't saved a second time
+    assert _lessons(env, meta[first]['student_id']) == [
+        name for name in ["week1.pdf", "week2.pdf"] if name != meta[first]['name']
+    ]
+    other = next(s for s in STUDENTS if s != meta[first]['student_id'])
+    assert _lessons(env, other) == ["week1.pdf", "week2.pdf"]
+
+
+def test_failed_entries_are_kept_and_retried(env):
+    _, meta = build_requests(env.pdf_dir, STUDENTS, env.store, env.blobs, "model")
+    failing = sorted(meta)[:1]
+
+    _run(env, FailingBatches(env.batches_root, set(failing)))
+
+    state = load_state(env.state)
+    assert state['failed'] == failing
+    info = meta[failing[0]]
+    assert info['name'] not in _lessons(env, info['student_id'])
+
+    _run(env, LocalBatches(env.batches_root), student_ids=[])
+
+    for student_id in STUDENTS:
+        assert _lessons(env, student_id) == ["week1.pdf", "week2.pdf"]
+    assert load_state(env.state) is None
+
@@ -0,0 +1,59 @@
+import threading
+from multiprocessing import Pool
+
+from ids import StudentIdAllocator, format_student_id
+from storage import UserStore
+
+YEAR = 2025
+
+
+def _reserve_in_process(args):
+    db, count = args
+    allocator = StudentIdAllocator(db)
+    return [allocator.next_id(YEAR) for _ in range(count)]
+
+
+def test_threads_sharing_an_allocator_get_distinct_ids(tmp_path):
+    allocator = StudentIdAllocator(str(tmp_path / "users.db"))
+    ids, lock = [], threading.Lock()
+
+    def take():
+        for _ in range(25):
+            student_id = allocator.next_id(YEAR)
+            with lock:
+                ids.append(student_id)
+
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ids) == len(set(ids)) == 200
+
+
+def test_processes_get_distinct_ids(tmp_path):
+    db = str(tmp_path / "users.db")
+    StudentIdAllocator(db)
+    with Pool(4) as pool:
+        ids = [student_id for batch in pool.map(_reserve_in_process, [(db, 20)] * 4) for student_id in batch]
+    assert len(ids) == len(set(ids)) == 80
+
+
+def test_continues_after_existing_students(tmp_path):
+    db = str(tmp_path / "users.db")
+    store = UserStore(db)
+    for student_id in ["STU20250007", "STU20250042", "STU20240900", "STU2025abc"]:
+        store.put({'student_id': student_id, 'name': "Existing", 'materials': []})
+
+    assert StudentIdAllocator(db).next_id(YEAR) == "STU20250043"
+    assert StudentIdAllocator(db).next_id(2024) == "STU20240901"
+
+
+def test_bulk_reserve_is_consecutive_and_not_reused(tmp_path):
+    db = str(tmp_path / "users.db")
+    first, second = StudentIdAllocator(db), StudentIdAllocator(db)
+
+    batch = first.reserve(5, YEAR)
+    assert batch == [format_student_id(YEAR, n) for n in range(1, 6)]
+    assert second.reserve_range(3, YEAR) == (YEAR, 6, 8)
+    assert first.next_id(YEAR) == "STU20250009"
@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+import jsonstream
+from jsonstream import iter_array, iter_object
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(jsonstream, "CHUNK_CHARS", 64)
+
+
+def test_records_spanning_chunks(small_chunks):
+    records = [{'id': n, 'text': "x" * (n * 37), 'ok': n % 2 == 0, 'score': n * 1.5} for n in range(20)]
+    assert list(iter_array(io.StringIO(json.dumps(records)))) == records
+    keyed = {str(r['id']): r for r in records}
+    assert dict(iter_object(io.StringIO(json.dumps(keyed)))) == keyed
+
+
+def test_long_value_reads_a_growing_amount(small_chunks):
+    f = CountingReader(json.dumps([{'text': "y" * 64 * 1000}]))
+    assert len(next(iter_array(f))['text']) == 64 * 1000
+    # Doubling reads: about log2(1000) of them, not one per chunk
+    assert f.reads < 20
+
+
+def test_malformed_value_fails_without_reading_the_rest(small_chunks):
+    f = CountingReader('[{"a" 1}, ' + json.dumps([{'b': "z" * 64}] * 1000)[1:])
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array(f))
+    assert f.reads <= 2
+
+
+def test_truncated_file_raises(small_chunks):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array(io.StringIO(json.dumps([{'text': "w" * 500}])[:-10])))
@@ -0,0 +1,58 @@
+import base64
+import io
+
+import pypdf
+
+from long_lessons import sections
+from prompts import cached_prefix, section_request
+
+CONTEXT = "## STUDENT PROFILE\n- Name: {{student_name}}"
+
+
+def blank_pdf(pages):
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def lecture(vision):
+    return [{'page': n, 'text': f"Text of page {n}. " * 20, 'vision': n in vision} for n in range(1, 13)]
+
+
+def test_vision_pdf_is_labelled_with_original_page_numbers():
+    blocks = cached_prefix("UERG", CONTEXT, "[Page 1]\n...", vision_pages=[4, 9, 12])
+    assert blocks[0]['type'] == "document"
+    assert "pages 4, 9, 12 of the lecture" in blocks[1]['text']
+
+
+def test_whole_pdf_has_no_page_note():
+    assert [block['type'] for block in cached_prefix("UERG", CONTEXT)] == ["document", "text"]
+
+
+def test_sections_carry_their_vision_pages():
+    result = sections(lecture({3, 7, 8}), blank_pdf(12), max_chars=2000)
+    assert [section[4] for section in result] == [[3], [7, 8], []]
+    for first, last, text, vision_base64, vision_pages in result:
+        if vision_pages:
+            pdf = pypdf.PdfReader(io.BytesIO(base64.b64decode(vision_base64)))
+            assert len(pdf.pages) == len(vision_pages)
+            request = section_request("model", {'name': "x"}, CONTEXT, first, last, text, vision_base64, vision_pages)
+            notes = [b['text'] for b in request['messages'][0]['content'] if "attached PDF" in b.get('text', "")]
+            assert notes and ", ".join(map(str, vision_pages)) in notes[0]
+        else:
+            assert vision_base64 is None
+
+
+def test_sections_share_a_cached_prefix_and_leave_their_pages_uncached():
+    contents = [
+        section_request("model", {'name': "x"}, CONTEXT, first, last, text, vision_base64, vision_pages)['messages'][0]['content']
+        for first, last, text, vision_base64, vision_pages in sections(lecture({3, 7}), blank_pdf(12), max_chars=2000)
+    ]
+    cached = [[i for i, block in enumerate(content) if 'cache_control' in block] for content in contents]
+    assert cached == [[1]] * len(contents)
+    # Everything up to the breakpoint is identical across sections
+    assert all(content[:2] == contents[0][:2] for content in contents)
+    assert any(block['type'] == "document" for block in contents[0][2:])
@@ -0,0 +1,11 @@
+from scheduler import MIN_SESSION, estimate_minutes
+
+
+def test_measured_and_inline_lessons_get_the_same_time():
+    lesson = "x" * 20000
+    assert estimate_minutes({'lesson_chars': len(lesson)}) == 40
+    assert estimate_minutes({'lesson': lesson}) == 40
+
+
+def test_material_without_a_lesson_gets_the_minimum():
+    assert estimate_minutes({}) == MIN_SESSION
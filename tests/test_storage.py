@@ -0,0 +1,137 @@
+import threading
+
+from storage import UserStore
+
+
+def user(student_id, name, **fields):
+    return {'student_id': student_id, 'name': name, 'materials': [], **fields}
+
+
+def test_interleaved_writes_from_two_processes_are_all_found(tmp_path):
+    # Two stores on one file stand in for two Streamlit processes: separate connections and indexes
+    db = str(tmp_path / "users.db")
+    a, b = UserStore(db), UserStore(db)
+
+    a.put(user("STU1", "Ann"))
+    b.put(user("STU2", "Ben"))     # committed by the other process...
+    a.put(user("STU3", "Cat"))     # ...before this process's next write gets a higher version
+    b.put(user("STU4", "Dan"))
+    a.put(user("STU5", "Eve"))
+
+    for store in (a, b):
+        for student_id, name in [("STU1", "Ann"), ("STU2", "Ben"), ("STU3", "Cat"), ("STU4", "Dan"), ("STU5", "Eve")]:
+            assert store.find(student_id, name)['name'] == name
+        assert sorted(store.index.student_ids()) == ["STU1", "STU2", "STU3", "STU4", "STU5"]
+
+
+def test_batched_writes_from_another_process_are_found(tmp_path):
+    db = str(tmp_path / "users.db")
+    a, b = UserStore(db), UserStore(db)
+
+    a.put(user("STU1", "Ann"))
+    b.put_many([user(f"STU{n}", f"Name {n}") for n in range(2, 50)])
+    a.put_many([user("STU50", "Zed")])
+
+    assert len(a.index.student_ids()) == 50
+    assert a.find("STU25", "name 25") is not None
+
+
+def test_cached_record_is_refreshed_after_another_process_writes(tmp_path):
+    db = str(tmp_path / "users.db")
+    a, b = UserStore(db), UserStore(db)
+    a.put(user("STU1", "Ann", completed=0))
+    assert a.get("STU1")['completed'] == 0          # now in a's cache
+
+    record = b.get("STU1")
+    record['completed'] = 1
+    b.put(record)
+    a.put(user("STU2", "Ben"))                      # a local write after the other process's
+
+    # A read-modify-put on a stale copy would undo the other worker's change
+    record = a.get("STU1")
+    assert record['completed'] == 1
+    record['study_streak'] = 3
+    a.put(record)
+    assert b.get("STU1")['completed'] == 1 and b.get("STU1")['study_streak'] == 3
+
+
+def test_reused_rowid_does_not_return_another_student(tmp_path):
+    db = str(tmp_path / "users.db")
+    writer = UserStore(db)
+    writer.put(user("STU1", "Ann"))
+    writer.put(user("STU2", "Ben"))
+    reader = UserStore(db)
+    ann_rowid = reader.index.lookup("STU1")[1]
+
+    # Move rows around under the reader's index without changing their versions
+    conn = writer._conn()
+    conn.execute("UPDATE users SET rowid = 1000 WHERE student_id = 'STU1'")
+    conn.execute("UPDATE users SET rowid = ? WHERE student_id = 'STU2'", (ann_rowid,))
+
+    assert reader.find("STU1", "Ann")['name'] == "Ann"
+    assert reader.get("STU1")['student_id'] == "STU1"
+
+
+def test_find_rechecks_the_name_on_the_row(tmp_path):
+    db = str(tmp_path / "users.db")
+    writer = UserStore(db)
+    writer.put(user("STU1", "Ann"))
+    reader = UserStore(db)
+
+    # The row changes name without a new version, so the index still says "ann"
+    writer._conn().execute("UPDATE users SET name_key = 'someone else' WHERE student_id = 'STU1'")
+    reader.cache = type(reader.cache)()
+
+    assert reader.find("STU1", "Ann") is None
+
+
+def test_write_only_store_keeps_no_index_or_cache(tmp_path):
+    db = str(tmp_path / "users.db")
+    UserStore(db).put(user("STU1", "Ann"))
+    loader = UserStore(db, write_only=True)
+    assert loader.index is None and loader.cache is None
+
+    loader.put_many([user(f"STU{n}", f"Name {n}") for n in range(2, 10)])
+    loader.put(user("STU10", "Zed"))
+
+    assert loader.count() == 10 and len(loader.all()) == 10
+    assert UserStore(db).find("STU10", "zed")['name'] == "Zed"
+
+
+def test_group_commit_updates_the_login_index_and_cache(tmp_path):
+    db = str(tmp_path / "users.db")
+    store = UserStore(db, group_commit_ms=20)
+    threads = [threading.Thread(target=store.put, args=(user(f"STU{n}", f"Name {n}"),)) for n in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n in range(10):
+        entry = store.index.lookup(f"STU{n}")
+        assert entry is not None and entry[0] == f"name {n}"
+        assert store.cache.get(f"STU{n}", entry[2])['name'] == f"Name {n}"
+    assert UserStore(db).count() == 10
+
+
+def test_group_commit_failure_reaches_every_caller(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"), group_commit_ms=200)
+    records = [user(f"STU{n}", f"Name {n}") for n in range(4)]
+    records.append({'student_id': "STU9", 'materials': []})   # no name: fails the whole batch
+    errors = []
+
+    def save(record):
+        try:
+            store.put(record)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(record,)) for record in records]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == len(records)
+    assert store.count() == 0
+    assert store.index.lookup("STU0") is None
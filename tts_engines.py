@@ -0,0 +1,150 @@
+"""Text-to-speech backends.
+
+The engine is picked with LEARNWELL_TTS_ENGINE:
+    gtts     Google TTS over the network (default), MP3
+    espeak   espeak-ng run locally as a subprocess, WAV
+    piper    Piper neural voices, kept loaded in a pool of local processes, WAV
+             (needs LEARNWELL_PIPER_MODEL pointing at a .onnx voice)
+"""
+import io
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+
+
+class GTTSEngine:
+    name = "gtts"
+    format = "mp3"
+    mime = "audio/mp3"
+
+    def synthesize(self, text, lang='en', tld='co.uk'):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False, tld=tld).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+def _local_voice(lang, tld):
+    # Match gTTS's regional accents where espeak-ng has one
+    if lang == 'en':
+        return {'co.uk': 'en-gb', 'com': 'en-us', 'com.au': 'en-us', 'ie': 'en-gb'}.get(tld, 'en-gb')
+    return lang
+
+
+class EspeakEngine:
+    """espeak-ng in a subprocess. It starts in milliseconds, so there is nothing to keep warm."""
+    name = "espeak"
+    format = "wav"
+    mime = "audio/wav"
+
+    def __init__(self, binary=None, max_workers=4):
+        self.binary = binary or shutil.which("espeak-ng") or shutil.which("espeak")
+        if self.binary is None:
+            raise RuntimeError("espeak-ng is not installed")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def synthesize(self, text, lang='en', tld='co.uk'):
+        with self._slots:
+            result = subprocess.run(
+                [self.binary, "--stdout", "-v", _local_voice(lang, tld), "-s", "160"],
+                input=text.encode('utf-8'), capture_output=True, check=True, timeout=60
+            )
+        return result.stdout
+
+
+class _PiperWorker:
+    """One long-running piper process with the voice model already loaded"""
+
+    def __init__(self, binary, model, out_dir):
+        self.out_dir = out_dir
+        self.process = subprocess.Popen(
+            [binary, "--model", model, "--json-input", "--output_dir", out_dir, "--quiet"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def synthesize(self, text):
+        fd, path = tempfile.mkstemp(suffix=".wav", dir=self.out_dir)
+        os.close(fd)
+        try:
+            self.process.stdin.write(json.dumps({"text": text, "output_file": path}) + "\n")
+            self.process.stdin.flush()
+            # piper prints the path of each file once it has been written
+            if not self.process.stdout.readline():
+                raise RuntimeError("piper exited")
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+    def close(self):
+        if self.alive():
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+
+
+class PiperEngine:
+    name = "piper"
+    format = "wav"
+    mime = "audio/wav"
+
+    def __init__(self, model=None, binary=None, workers=2):
+        self.model = model or os.getenv('LEARNWELL_PIPER_MODEL')
+        self.binary = binary or shutil.which("piper")
+        if not self.model or self.binary is None:
+            raise RuntimeError("piper needs the piper binary and LEARNWELL_PIPER_MODEL")
+        self.out_dir = tempfile.mkdtemp(prefix="learnwell-piper-")
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(_PiperWorker(self.binary, self.model, self.out_dir))
+
+    def synthesize(self, text, lang='en', tld='co.uk'):
+        # Piper voices are per model, so lang and tld are fixed by LEARNWELL_PIPER_MODEL
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker = _PiperWorker(self.binary, self.model, self.out_dir)
+            return worker.synthesize(text.replace("\n", " "))
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+ENGINES = {
+    'gtts': GTTSEngine,
+    'espeak': EspeakEngine,
+    'piper': PiperEngine,
+}
+
+
+def get_engine(name=None):
+    """Build the configured engine"""
+    name = (name or os.getenv('LEARNWELL_TTS_ENGINE', 'gtts')).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine '{name}'. Choose from: {', '.join(ENGINES)}")
+    return ENGINES[name]()
+
+
+def join_wav(parts):
+    """Concatenate WAV files that share one sample format"""
+    out = io.BytesIO()
+    writer = None
+    for part in parts:
+        with wave.open(io.BytesIO(part), 'rb') as reader:
+            if writer is None:
+                writer = wave.open(out, 'wb')
+                writer.setparams(reader.getparams())
+            writer.writeframes(reader.readframes(reader.getnframes()))
+    if writer is not None:
+        writer.close()
+    return out.getvalue()
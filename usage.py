@@ -0,0 +1,37 @@
+import threading
+
+
+class TokenUsage:
+    """Running token totals across model calls, including prompt-cache reads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, usage):
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += usage.input_tokens or 0
+            self.cache_read_input_tokens += getattr(usage, 'cache_read_input_tokens', 0) or 0
+            self.cache_creation_input_tokens += getattr(usage, 'cache_creation_input_tokens', 0) or 0
+            self.output_tokens += usage.output_tokens or 0
+
+    def cached_share(self):
+        """Fraction of all input tokens that were read from the prompt cache"""
+        total = self.input_tokens + self.cache_read_input_tokens + self.cache_creation_input_tokens
+        return self.cache_read_input_tokens / total if total else 0.0
+
+    def summary(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'input_tokens': self.input_tokens,
+                'cache_read_input_tokens': self.cache_read_input_tokens,
+                'cache_creation_input_tokens': self.cache_creation_input_tokens,
+                'output_tokens': self.output_tokens,
+                'cached_share': self.cached_share()
+            }